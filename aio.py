@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+concurrent evaluation of yin programs
+
+python 2 has no asyncio, so every program started with
+Interpreter.interp_async runs on its own thread and the I/O primitives
+(sleep, read-file, socket-*) suspend only that thread. The host keeps
+running and can wait on a Task with wait()/result(), callbacks, or by
+polling Task.fileno() in its own select()/poll() based event loop.
+
+each thread has its own call stack, budget and output sink. Hooks, the
+profiler, stats and pgo recording are not per thread: they patch the
+evaluator classes for the whole process, so interp_async refuses a program
+that uses them, and a program run with them on the main thread also counts
+the tasks running meanwhile.
+"""
+import os
+import threading
+
+
+class Task(object):
+    def __init__(self, interpreter):
+        self.interpreter = interpreter
+        self.callbacks = []
+        self.value = None
+        self.error = None
+        self.finished = threading.Event()
+        self.lock = threading.Lock()
+        self.rfd = self.wfd = None      # created by fileno()
+        self.thread = threading.Thread(target=self.run)
+        self.thread.daemon = True
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def run(self):
+        try:
+            self.value = self.interpreter.interp()
+        except BaseException, e:
+            self.error = e
+        with self.lock:
+            self.finished.set()
+            callbacks, self.callbacks = self.callbacks, []
+            if self.wfd is not None:
+                os.write(self.wfd, 'x')
+        for fn in callbacks:
+            fn(self)
+
+    def fileno(self):
+        """
+        readable once the task is done; the pipe behind it is only made
+        when asked for, close() releases it
+        """
+        with self.lock:
+            if self.rfd is None:
+                self.rfd, self.wfd = os.pipe()
+                if self.finished.is_set():
+                    os.write(self.wfd, 'x')
+            return self.rfd
+
+    def done(self):
+        return self.finished.is_set()
+
+    def wait(self, timeout=None):
+        self.finished.wait(timeout)
+        return self.done()
+
+    def result(self, timeout=None):
+        if not self.wait(timeout):
+            raise RuntimeError('task is not done')
+        if self.error is not None:
+            raise self.error
+        return self.value
+
+    def exception(self):
+        return self.error
+
+    def add_done_callback(self, fn):
+        with self.lock:
+            if not self.finished.is_set():
+                self.callbacks.append(fn)
+                return
+        fn(self)
+
+    def close(self):
+        with self.lock:
+            if self.rfd is not None:
+                os.close(self.rfd)
+                os.close(self.wfd)
+                self.rfd = self.wfd = None
+
+
+def spawn(interpreter):
+    return Task(interpreter).start()
+
+
+def gather(tasks, timeout=None):
+    """
+    wait for all the tasks, returns their results in order
+    """
+    return [t.result(timeout) for t in tasks]
@@ -10,8 +10,11 @@ from values import *
 from util import *
 from environment import *
 from error import InterpError, ParserError
+import limits
 
 class Node(object):
+    __slots__ = ('fname', 'start', 'end', 'line', 'col')
+
     def __init__(self, fname, start, end, line, col):
         self.fname = fname
         self.start = start
@@ -19,6 +22,12 @@ class Node(object):
         self.line = line
         self.col = col
 
+    def children(self):
+        """
+        the sub nodes, in source order
+        """
+        return []
+
     def node_type(self, ty):
         AA = True
         if AA:
@@ -27,22 +36,31 @@ class Node(object):
             return ''
 
 class FloatNode(Node):
+    __slots__ = ('value', 'const')
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(FloatNode, self).__init__(fname, start, end, line, col)
+        self.const = None       # the value, made on first use
         try:
             self.value = float(lexeme)          # need fixed
         except ValueError:
             raise ParserError(self, "invlid literal for float")
 
     def interp(self, tbl):
-        return FloatValue(self.value)
+        v = self.const
+        if v is None:
+            v = self.const = FloatValue(self.value)
+        return v
 
     def __str__(self):
         return str(self.value) + self.node_type('float')
 
 class IntNode(Node):
+    __slots__ = ('value', 'const')
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(IntNode, self).__init__(fname, start, end, line, col)
+        self.const = None       # the value, made on first use
         self.value = self.parse_number(lexeme)
 
     def parse_number(self, lexeme):
@@ -63,7 +81,10 @@ class IntNode(Node):
             raise ParserError(self, "Not a number")
 
     def interp(self, tbl):
-        return IntValue(self.value)
+        v = self.const
+        if v is None:
+            v = self.const = IntValue(self.value)
+        return v
 
     def typecheck(self, tenv):
         return BasicType.INT
@@ -72,12 +93,18 @@ class IntNode(Node):
         return str(self.value) + self.node_type('int')
 
 class StrNode(Node):
+    __slots__ = ('value', 'const')
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(StrNode, self).__init__(fname, start, end, line, col)
+        self.const = None       # the value, made on first use
         self.value = lexeme.lstrip(STRING_BEGIN).rstrip(STRING_END)
 
     def interp(self, tbl):
-        return StrValue(self.value)
+        v = self.const
+        if v is None:
+            v = self.const = StrValue(self.value)
+        return v
 
     def typecheck(self, tenv):
         return BasicType.STR
@@ -86,15 +113,21 @@ class StrNode(Node):
         return STRING_BEGIN + self.value + STRING_END + self.node_type('str')
 
 class BoolNode(Node):
+    __slots__ = ('value', 'const')
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(BoolNode, self).__init__(fname, start, end, line, col)
+        self.const = None       # the value, made on first use
         if lexeme == TRUE_KW:
             self.value = True
         else:
             self.value = False
 
     def interp(self, tbl):
-        return BoolValue(self.value)
+        v = self.const
+        if v is None:
+            v = self.const = BoolValue(self.value)
+        return v
 
     def typecheck(self, tenv):
         return BasicType.BOOL
@@ -103,6 +136,8 @@ class BoolNode(Node):
         return (TRUE_KW if self.value else FALSE_KW) + self.node_type('bool')
 
 class KeywordNode(Node):
+    __slots__ = ('id',)
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(KeywordNode, self).__init__(fname, start, end, line, col)
         self.id = lexeme[len(KEYWORD_PREFIX):]
@@ -125,11 +160,15 @@ class KeywordNode(Node):
 
 
 class VectorNode(Node):
+    __slots__ = ('elements',)
+
     def __init__(self, elements, fname, start, end, line, col):
         super(VectorNode, self).__init__(fname, start, end, line, col)
         self.elements = elements
 
     def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.alloc(self, len(self.elements))
         ret = map(lambda ele: ele.interp(tbl), self.elements)
         return VectorValue(ret)
 
@@ -141,6 +180,9 @@ class VectorNode(Node):
             else:
                 ret.add(e)
 
+    def children(self):
+        return list(self.elements)
+
     def __str__(self):
         ss = ' '.join(map(str, self.elements))
         output = VECTOR_BEGIN + self.node_type('vec ') + ss + VECTOR_END
@@ -151,6 +193,8 @@ class SubscriptNode(Node):
     """
     Vector Subscript Node
     """
+    __slots__ = ('value', 'index')
+
     def __init__(self, val, idx, fname, start, end, line, col):
         super(SubscriptNode, self).__init__(fname, start, end, line, col)
         self.value = val
@@ -169,11 +213,16 @@ class SubscriptNode(Node):
 
         return vec.values[idx.value]
 
+    def children(self):
+        return [self.value, self.index]
+
     def __str__(self):
         return str(self.value) + VECTOR_SUB + str(self.index)
 
 
 class RecordLiteralNode(Node):
+    __slots__ = ('kv_map', 's_kv_map')
+
     def __init__(self, kv_map, fname, start, end, line, col):
         super(RecordLiteralNode, self).__init__(fname, start, end, line, col)
         self.kv_map = kv_map    # {KeywordNode => Node}
@@ -182,6 +231,8 @@ class RecordLiteralNode(Node):
             self.s_kv_map[k.id] = kv_map[k]
 
     def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.alloc(self, len(self.s_kv_map))
         ret = {}
         for k in self.s_kv_map:
             ret[k] = self.s_kv_map[k].interp(tbl)
@@ -195,6 +246,12 @@ class RecordLiteralNode(Node):
             else:
                 ret.add(v)
 
+    def children(self):
+        ret = []
+        for k, v in self.kv_map.items():
+            ret.extend([k, v])
+        return ret
+
     def __str__(self):
         ss = ' '.join(map(lambda k: str(k)+' '+str(self.kv_map[k]), self.kv_map))
         output = RECORD_BEGIN + self.node_type('rec ') + ss + RECORD_END
@@ -202,6 +259,8 @@ class RecordLiteralNode(Node):
 
 
 class RecordDefNode(Node):
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -213,6 +272,8 @@ class AttrNode(Node):
     """
     Record Attribute Node
     """
+    __slots__ = ('value', 'attr')
+
     def __init__(self, val, attr, fname, start, end, line, col):
         super(AttrNode, self).__init__(fname, start, end, line, col)
         self.value = val
@@ -225,13 +286,25 @@ class AttrNode(Node):
         if not IS(self.attr, NameNode):
             raise InterpError(self.attr, "Not a attribute name")
         attr = self.attr.id
-        return rec.kv_map[attr]
+        kv_map = rec.kv_map
+        try:
+            return kv_map[attr]
+        except KeyError:
+            if IS(rec, ModuleValue):
+                raise InterpError(self.attr, "module %s has no export %s"
+                                  % (rec.name, attr))
+            raise InterpError(self.attr, "record has no attribute %s" % attr)
+
+    def children(self):
+        return [self.value, self.attr]
 
     def __str__(self):
         return str(self.value) + RECORD_ATTR + str(self.attr)
 
 
 class NameNode(Node):
+    __slots__ = ('id',)
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(NameNode, self).__init__(fname, start, end, line, col)
         self.id = lexeme
@@ -253,6 +326,8 @@ class NameNode(Node):
 
 
 class IfNode(Node):
+    __slots__ = ('test', 'conseq', 'alt')
+
     def __init__(self, test, conseq, alt, fname, start, end, line, col):
         super(IfNode, self).__init__(fname, start, end, line, col)
         self.test = test
@@ -268,37 +343,107 @@ class IfNode(Node):
         else:
             return self.alt.interp(tbl)
 
+    def children(self):
+        return [self.test, self.conseq, self.alt]
+
     def __str__(self):
         ss = ' '.join([IF_KW, str(self.test), str(self.conseq), str(self.alt)])
         output = PAREN_BEGIN + self.node_type('if ') + ss + PAREN_END
         return output
 
+
+class TypedIfNode(IfNode):
+    """
+    IfNode whose test the type checker proved to be a boolean
+    """
+    __slots__ = ()
+
+    def interp(self, tbl):
+        if self.test.interp(tbl).value:
+            return self.conseq.interp(tbl)
+        else:
+            return self.alt.interp(tbl)
+
+
 class DefNode(Node):
+    __slots__ = ('pattern', 'value', 'matcher')
+
     def __init__(self, pattern, val, fname, start, end, line, col):
         super(DefNode, self).__init__(fname, start, end, line, col)
         self.pattern = pattern
         self.value = val
+        self.matcher = None     # compile_bind(pattern), on first use
 
     def interp(self, tbl):
-        patt = self.pattern
         val = self.value.interp(tbl)
-        bind(patt, val, tbl)
+        self.match(val, tbl)
+
+    def match(self, val, tbl):
+        matcher = self.matcher
+        if matcher is None:
+            matcher = self.matcher = compile_bind(self.pattern)
+        matcher(val, tbl)
+
+    def __getstate__(self):
+        # the matcher is a closure, it is compiled again after loading
+        return None, slot_state(self, matcher=None)
+
+    def children(self):
+        return [self.pattern, self.value]
 
     def __str__(self):
         output = PAREN_BEGIN + self.node_type('def ') + DEFINE_KW + ' ' +\
                  str(self.pattern) + ' ' + str(self.value) + PAREN_END
         return output
 
+class ImportNode(Node):
+    """
+    (import name) binds the last component of name, e.g. `math` for
+    lib/math, to the module; see modules.py
+    """
+    __slots__ = ('name', 'pattern')
+
+    def __init__(self, name, pattern, fname, start, end, line, col):
+        super(ImportNode, self).__init__(fname, start, end, line, col)
+        self.name = name
+        self.pattern = pattern      # NameNode
+
+    def interp(self, tbl):
+        import modules
+        bind(self.pattern, modules.find(self), tbl)
+
+    def children(self):
+        return [self.pattern]
+
+    def __str__(self):
+        return PAREN_BEGIN + self.node_type('imp ') + IMPORT_KW + ' ' +\
+            self.name + PAREN_END
+
+
 class AssignNode(Node):
+    __slots__ = ('pattern', 'value', 'matcher')
+
     def __init__(self, pattern, val, fname, start, end, line, col):
         super(AssignNode, self).__init__(fname, start, end, line, col)
         self.pattern = pattern
         self.value = val
+        self.matcher = None     # compile_assign(pattern), on first use
 
     def interp(self, tbl):
-        patt = self.pattern
         val = self.value.interp(tbl)
-        assign(patt, val, tbl)
+        self.match(val, tbl)
+
+    def match(self, val, tbl):
+        matcher = self.matcher
+        if matcher is None:
+            matcher = self.matcher = compile_assign(self.pattern)
+        matcher(val, tbl)
+
+    def __getstate__(self):
+        return None, slot_state(self, matcher=None)
+
+    def children(self):
+        return [self.pattern, self.value]
 
     def __str__(self):
         output = PAREN_BEGIN + self.node_type('ass ') + ASSIGN_KW +\
@@ -307,17 +452,53 @@ class AssignNode(Node):
 
 
 class FunNode(Node):
+    __slots__ = ('args', 'properties', 'body', 'free', 'depth', 'guards')
+
     def __init__(self, args, properties, body, fname, start, end, line, col):
         super(FunNode, self).__init__(fname, start, end, line, col)
         self.args = args
         self.properties = properties
         self.body = body
+        self.free = None        # [(name, tables up)], set by scope.py
+        self.depth = None       # tables up to the global one
 
     def interp(self, tbl):
         properties = self.properties
         if properties:
             self.interp_properties(tbl)
-        return Closure(self.args, properties, self.body, tbl)
+        return Closure(self.args, properties, self.body, self.capture(tbl))
+
+    def capture(self, tbl):
+        """
+        the table of a new closure: a flat layer of the entries of its free
+        variables on top of the global table, see scope.py
+        """
+        if self.depth is None:          # not analyzed
+            return tbl
+        top = tbl
+        for i in xrange(self.depth):
+            top = top.parent
+        if not self.free:
+            return top
+        env = SymTable(top)
+        for name, hops in self.free:
+            layer = tbl
+            for i in xrange(hops):
+                layer = layer.parent
+            entry = layer.table.get(name)
+            if entry is None:
+                # defined later in its block, the define fills the entry
+                entry = layer.table[name] = {}
+            env.table[name] = entry
+        return env
+
+    def children(self):
+        ret = list(self.args)
+        if self.properties:
+            for entry in self.properties.table.values():
+                ret.extend([v for v in entry.values() if IS(v, Node)])
+        ret.append(self.body)
+        return ret
 
     def __str__(self):
         args_ss = PAREN_BEGIN + ' '.join(map(str, self.args)) + PAREN_END
@@ -341,11 +522,25 @@ class FunNode(Node):
         return tbl
 
 
+class TypedFunNode(FunNode):
+    """
+    FunNode with annotated parameter types the type checker relies on, its
+    closures check them on every call (self.guards, set by the checker)
+    """
+    __slots__ = ()
+
+    def interp(self, tbl):
+        closure = super(TypedFunNode, self).interp(tbl)
+        closure.guards = self.guards
+        return closure
+
 
 class ArgumentNode(Node):
     """
     Arguments for CallNode, support keyword argument and positional argument
     """
+    __slots__ = ('positional', 'keywords')
+
     def __init__(self, pos_nodes, kw_nodes, fname, start, end, line, col):
         self.positional = pos_nodes
         self.keywords = kw_nodes
@@ -363,44 +558,69 @@ class ArgumentNode(Node):
             keywords[k.as_name()] = self.keywords[k].interp(tbl)
         return positional, keywords
 
+    def children(self):
+        ret = list(self.positional)
+        for k, v in self.keywords.items():
+            ret.extend([k, v])
+        return ret
+
     def __str__(self):
         ss = ' '.join(map(str, self.positional)) + ' ' + str(self.keywords)
         return PAREN_BEGIN + self.node_type('arg ') + ss + PAREN_END
 
 
 class CallNode(Node):
+    # prim, result and guard are set on specialized calls (PrimCallNode,
+    # pgo.py)
+    __slots__ = ('fun', 'args', 'prim', 'result', 'guard')
+
     def __init__(self, fun, args, fname, start, end, line, col):
         super(CallNode, self).__init__(fname, start, end, line, col)
         self.fun = fun
         self.args = args        # ArgumentNode
 
     def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.step(self)
         fv = self.fun.interp(tbl)
         positional_args, keyword_args = self.args.interp(tbl)
+        return self.apply(fv, positional_args, keyword_args)
 
+    def apply(self, fv, positional_args, keyword_args):
         if IS(fv, Closure):
             formal_args = fv.args
             body = fv.body
-            if len(positional_args) + len(keyword_args) != len(formal_args):
+            n = len(positional_args)
+            if n + len(keyword_args) != len(formal_args):
                 raise InterpError(self.args, "wrong number of actual arguments")
-            kw = {}
-            for i in range(len(positional_args)):
-                param = formal_args[i]
-                kw[param] = positional_args[i]
-            for i in range(len(positional_args), len(formal_args)):
-                param = formal_args[i]
-                if param not in keyword_args:
-                    raise InterpError(self.args, "param name(%s) is not a keyword"% param)
-                kw[param] = keyword_args[param]
+            values = positional_args
+            if keyword_args:
+                values = list(positional_args)
+                for param in formal_args[n:]:
+                    if param not in keyword_args:
+                        raise InterpError(self.args, "param name(%s) is not a keyword"% param)
+                    values.append(keyword_args[param])
 
             new_tbl = SymTable(fv.tbl)
-            for k, v in kw.items():
+            for k, v in zip(formal_args, values):
                 bind(k, v, new_tbl)
-
-            callstack.append(self)
-            ret = body.interp(new_tbl)
-            callstack.pop()
-            return ret
+            if fv.guards:
+                for k, v in zip(formal_args, values):
+                    guard = fv.guards.get(k.id)
+                    if guard and not IS(v, guard[0]):
+                        raise InterpError(self.args, "argument %s is not of type %s"
+                                          % (k.id, guard[1]))
+
+            frames = callstack.frames
+            frames.append(self)
+            try:
+                return body.interp(new_tbl)
+            except RuntimeError, e:
+                if 'recursion' not in str(e):
+                    raise
+                raise InterpError(self, 'stack overflow: calls nested too deeply')
+            finally:
+                frames.pop()
         elif IS(fv, PrimitiveFun):
             if not fv.check_arity(len(positional_args)):
                 if fv.min_arity == fv.max_arity:
@@ -410,34 +630,135 @@ class CallNode(Node):
                 msg = """the expected %s arguments, but given %s
                 """ % (expected, len(positional_args))
                 raise InterpError(self,  msg)
-            return fv.apply(positional_args)
+            if fv.calls_back:
+                frames = callstack.frames
+                frames.append(self)
+                outer = callstack.callback_depth
+                callstack.callback_depth = len(frames)
+                try:
+                    ret = fv.apply(positional_args)
+                finally:
+                    callstack.callback_depth = outer
+                    frames.pop()
+            else:
+                ret = fv.apply(positional_args)
+            if limits.state.active and IS(ret, VectorValue):
+                limits.state.active.alloc(self, len(ret.values))
+            return ret
         else:
             raise InterpError(self, "unkown type function")
 
+    def children(self):
+        return [self.fun, self.args]
+
     def __str__(self):
         output = PAREN_BEGIN + self.node_type('call ') + str(self.fun) + ' ' +\
                  str(self.args) + PAREN_END
         return output
 
 
+class PrimCallNode(CallNode):
+    """
+    call of a primitive whose positional arguments the type checker proved
+    to have the right types; it skips the checks of PrimitiveFun.apply and
+    falls back to the generic path if the name no longer means the primitive
+    (self.prim and self.result are set by the checker)
+    """
+    __slots__ = ()
+
+    def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.step(self)
+        fv = self.fun.interp(tbl)
+        if fv is not self.prim:
+            positional_args, keyword_args = self.args.interp(tbl)
+            return self.apply(fv, positional_args, keyword_args)
+        xs = [arg.interp(tbl).value for arg in self.args.positional]
+        return self.result(fv.compute(xs))
+
+
 class BlockNode(Node):
+    __slots__ = ('statements',)
+
     def __init__(self, statements, fname, start, end, line, col):
         super(BlockNode, self).__init__(fname, start, end, line, col)
         self.statements = statements
 
     def interp(self, tbl):
         tbl = SymTable(tbl)              # create new symbol table
+        return self.interp_statements(tbl)
+
+    def interp_statements(self, tbl):
+        """
+        evaluate the statements in tbl itself, returns the last value
+        """
         for s in self.statements[:-1]:
             s.interp(tbl)
         last = self.statements[len(self.statements)-1]
         return last.interp(tbl)
 
+    def children(self):
+        return list(self.statements)
+
     def __str__(self):
         stats_str = '\n'.join(map(str, self.statements))
         output = PAREN_BEGIN + SEQ_KW + ' ' + stats_str + PAREN_END
         return output
 
 
+def walk(node):
+    """
+    all the nodes of a tree, parents before their children
+    """
+    stack = [node]
+    while stack:
+        n = stack.pop()
+        yield n
+        stack.extend(reversed(n.children()))
+
+
+# nodes that carry no analysis results (the checker rewrites calls, ifs
+# and functions in place, scope.py annotates functions), so one instance
+# can stand for all the occurrences of the same subtree
+SHAREABLE = (IntNode, FloatNode, StrNode, BoolNode, NameNode, KeywordNode,
+             VectorNode, RecordLiteralNode)
+
+
+def share_key(node):
+    """
+    the key of node in a hash-consing table, made of the ids of its
+    children, so they must be shared already; None if node is not shared
+    """
+    cls = type(node)
+    if cls is FloatNode:
+        return cls, repr(node.value)            # 0.0 is not -0.0
+    elif cls in (IntNode, StrNode, BoolNode):
+        return cls, node.value
+    elif cls in (NameNode, KeywordNode):
+        return cls, node.id
+    elif cls is VectorNode:
+        if all(type(e) in SHAREABLE for e in node.elements):
+            return cls, tuple(map(id, node.elements))
+    elif cls is RecordLiteralNode:
+        if all(type(v) in SHAREABLE for v in node.kv_map.itervalues()):
+            return cls, frozenset((k.id, id(v))
+                                  for k, v in node.kv_map.iteritems())
+    return None
+
+
+def slot_state(obj, **override):
+    """
+    the slots of obj as a dict, for __getstate__
+    """
+    ret = {}
+    for cls in type(obj).__mro__:
+        for name in cls.__dict__.get('__slots__', ()):
+            if hasattr(obj, name):
+                ret[name] = getattr(obj, name)
+    ret.update(override)
+    return ret
+
+
 def bind(patt, val, tbl):
     if IS(patt, NameNode):
         if tbl.lookup_value_local(patt.id):
@@ -509,3 +830,125 @@ def assign(patt, val, tbl):
         rec.kv_map[attr] = val
     else:
         raise InterpError(patt, "unkown pattern")
+
+
+# compiled patterns: compile_bind(patt) and compile_assign(patt) return a
+# function (val, tbl) that does what bind(patt, val, tbl) and
+# assign(patt, val, tbl) do, with the same errors, but looks at the pattern
+# only once.
+
+def unknown_pattern(patt):
+    def match(val, tbl):
+        raise InterpError(patt, "unkown pattern")
+    return match
+
+
+def compile_bind(patt):
+    if IS(patt, NameNode):
+        name = patt.id
+
+        def match(val, tbl):
+            table = tbl.table
+            entry = table.get(name)
+            if entry is None and not tbl.frozen:
+                table[name] = {'value': val}
+            elif entry is not None and entry.get('value'):
+                raise InterpError(patt, "Trying to redefine the name " + str(patt))
+            else:
+                tbl.put_value(name, val)
+        return match
+    elif IS(patt, VectorNode):
+        return compile_vector(patt, map(compile_bind, patt.elements))
+    elif IS(patt, RecordLiteralNode):
+        return compile_record(patt, compile_bind)
+    else:
+        return unknown_pattern(patt)
+
+
+def compile_assign(patt):
+    if IS(patt, NameNode):
+        name = patt.id
+
+        def match(val, tbl):
+            tbl.set_value(name, val)
+        return match
+    elif IS(patt, VectorNode):
+        return compile_vector(patt, map(compile_assign, patt.elements))
+    elif IS(patt, RecordLiteralNode):
+        return compile_record(patt, compile_assign)
+    elif IS(patt, SubscriptNode):
+        return compile_subscript(patt)
+    elif IS(patt, AttrNode):
+        return compile_attr(patt)
+    else:
+        return unknown_pattern(patt)
+
+
+def compile_vector(patt, matchers):
+    n = len(matchers)
+
+    def match(val, tbl):
+        if not IS(val, VectorValue):
+            raise InterpError(patt, "unkown pattern")
+        values = val.values
+        if len(values) != n:
+            raise InterpError(patt, "the two vectors must have same length")
+        for m, v in zip(matchers, values):
+            m(v, tbl)
+    return match
+
+
+def compile_record(patt, compile_sub):
+    matchers = [(k, compile_sub(p)) for k, p in patt.s_kv_map.items()]
+    n = len(matchers)
+
+    def match(val, tbl):
+        if not IS(val, RecordLiteralValue):
+            raise InterpError(patt, "unkown pattern")
+        v_map = val.kv_map
+        if len(v_map) != n:
+            raise InterpError(patt, "the two record literal must have same length")
+        for k, m in matchers:
+            if k not in v_map:
+                raise InterpError(patt, "the two record literal must have same key set")
+        for k, m in matchers:
+            m(v_map[k], tbl)
+    return match
+
+
+def compile_subscript(patt):
+    value, index = patt.value, patt.index
+
+    def match(val, tbl):
+        vec = value.interp(tbl)
+        idx = index.interp(tbl)
+        if not IS(vec, VectorValue):
+            raise InterpError(value, 'Not a vector value')
+        if not IS(idx, IntValue):
+            raise InterpError(index, 'index is not a Integer')
+        if idx.value >= len(vec.values):
+            raise InterpError(index, 'out of index')
+        vec.values[idx.value] = val
+    return match
+
+
+def compile_attr(patt):
+    value = patt.value
+    if not IS(patt.attr, NameNode):
+        def match(val, tbl):
+            rec = value.interp(tbl)
+            if not IS(rec, RecordLiteralValue):
+                raise InterpError(value, 'Not a record literal value')
+            raise InterpError(patt.attr, 'Not a attribute name')
+        return match
+    attr = patt.attr.id
+
+    def match(val, tbl):
+        rec = value.interp(tbl)
+        if not IS(rec, RecordLiteralValue):
+            raise InterpError(value, 'Not a record literal value')
+        kv_map = rec.kv_map
+        if attr not in kv_map:
+            raise InterpError(patt, "record don't contain the attribute name")
+        kv_map[attr] = val
+    return match
@@ -0,0 +1,100 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+batch runner, evaluates many yin programs on a process pool
+
+usage: python batch.py [--jobs N] [--timeout SEC] [--summary out.json]
+                       file-or-dir-or-glob ...
+
+directories are searched recursively for *.yin files. Each program gets
+its own environment; its output, errors and wall time are reported per
+file and written to the JSON summary.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import multiprocessing
+
+from worker import warm_up, run_job
+
+
+def collect(patterns):
+    files = []
+    for patt in patterns:
+        if os.path.isdir(patt):
+            for root, dirs, names in os.walk(patt):
+                dirs.sort()
+                for name in sorted(names):
+                    if name.endswith('.yin'):
+                        files.append(os.path.join(root, name))
+        else:
+            matched = sorted(glob.glob(patt))
+            files.extend(matched if matched else [patt])
+    return files
+
+
+def _run(args):
+    idx, fname, timeout = args
+    ret = run_job(fname, timeout=timeout)
+    ret['index'] = idx
+    return ret
+
+
+def run_batch(files, jobs=None, timeout=None, report=None):
+    """
+    returns the results in the order of files
+    """
+    pool = multiprocessing.Pool(jobs, initializer=warm_up)
+    results = [None] * len(files)
+    try:
+        tasks = [(i, f, timeout) for i, f in enumerate(files)]
+        for ret in pool.imap_unordered(_run, tasks):
+            results[ret['index']] = ret
+            if report:
+                report(ret)
+    finally:
+        pool.terminate()
+        pool.join()
+    return results
+
+
+def print_result(ret):
+    status = 'FAIL' if ret['error'] else 'ok'
+    print '%-4s %9.3fs  %s' % (status, ret['time'], ret['name'])
+    sys.stdout.flush()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='run many yin programs')
+    ap.add_argument('paths', nargs='+', help='files, directories or globs')
+    ap.add_argument('--jobs', '-j', type=int, default=None,
+                    help='number of worker processes (default: cpu count)')
+    ap.add_argument('--timeout', type=float, default=None,
+                    help='per-file timeout in seconds')
+    ap.add_argument('--summary', help='write a JSON summary to this file')
+    opts = ap.parse_args()
+
+    files = collect(opts.paths)
+    start = time.time()
+    results = run_batch(files, opts.jobs, opts.timeout, print_result)
+    wall = time.time() - start
+
+    failed = [r for r in results if r['error']]
+    print '%d files, %d failed, %.3fs wall, %.3fs cpu' % \
+        (len(results), len(failed), wall, sum(r['time'] for r in results))
+    if opts.summary:
+        for r in results:
+            del r['index']
+        summary = {'files': len(results), 'failed': len(failed),
+                   'wall_time': wall, 'results': results}
+        with open(opts.summary, 'w') as fp:
+            json.dump(summary, fp, indent=2)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+flat closure benchmark: memory kept alive by long-lived closures and the
+time of captured-variable access, with flat closures (the default) and with
+closures that keep their whole defining chain of tables
+
+usage: python benchmarks/closure_memory.py [closures] [temporary size]
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+# each closure only uses n, but is created next to a large temporary
+RETAIN = """
+(define make
+  (fun (i)
+    (seq
+      (define big (range %(size)d))
+      (define n (length big))
+      (fun () (+ n i)))))
+(define keep (map make (range %(count)d)))
+(print (reduce + (map (fun (f) (f)) keep)))
+"""
+
+# captured variables three blocks up from the inner closure
+ACCESS = """
+(define f
+  (fun (a)
+    (seq
+      (define b 1)
+      (seq
+        (define c 2)
+        (seq
+          (define g (fun (k) (+ a b c k)))
+          (reduce (fun (acc x) (g acc)) 0 (range 50000)))))))
+(print (f 3))
+"""
+
+
+def run(mode, program):
+    """
+    run program in this process, prints the peak RSS in KB and the time
+    """
+    from parser import Parser
+    from environment import SymTable
+    from ast import walk, FunNode
+    node = Parser('<bench>', program).parse()
+    if mode == 'chain':
+        for n in walk(node):
+            if isinstance(n, FunNode):
+                n.depth = None
+    devnull = open(os.devnull, 'w')
+    out, sys.stdout = sys.stdout, devnull
+    start = time.time()
+    node.interp_statements(SymTable.init_value_table())
+    elapsed = time.time() - start
+    sys.stdout = out
+    print resource.getrusage(resource.RUSAGE_SELF).ru_maxrss, elapsed
+
+
+def measure(mode, program):
+    env = dict(os.environ, YIN_PROGRAM=program)
+    out = subprocess.check_output([sys.executable, __file__, '--run', mode],
+                                  env=env)
+    rss, elapsed = out.split()
+    return int(rss), float(elapsed)
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+    retain = RETAIN % dict(count=count, size=size)
+    print '%d closures, temporaries of %d elements' % (count, size)
+    print '%-8s %14s %14s' % ('', 'peak RSS', 'access time')
+    for mode in ('chain', 'flat'):
+        rss, _ = measure(mode, retain)
+        _, elapsed = measure(mode, ACCESS)
+        print '%-8s %11d KB %12.3f s' % (mode, rss, elapsed)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 3 and sys.argv[1] == '--run':
+        run(sys.argv[2], os.environ['YIN_PROGRAM'])
+    else:
+        main()
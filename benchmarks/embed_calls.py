@@ -0,0 +1,62 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+embedding benchmark: calls per second of a yin function called from
+python through embed.Program, against evaluating a source string per call
+(Interpreter.eval of the program and the call), for small arguments and
+for a large list
+
+usage: python benchmarks/embed_calls.py [calls] [list size]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from embed import Program, to_python
+
+PROGRAM = """
+(define add (fun (x y) (+ x y)))
+(define total (fun (xs) (reduce + 0 xs)))
+"""
+
+
+def rate(fn, n):
+    start = time.time()
+    for i in xrange(n):
+        fn(i)
+    return n / (time.time() - start)
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+    prog = Program('<bench>', PROGRAM)
+    add = prog.function('add')
+    total = prog.function('total')
+    xs = range(size)
+
+    def eval_add(i):
+        return to_python(Interpreter.eval(PROGRAM + '(add %d 2)' % i))
+
+    def eval_total(i):
+        src = '(total [%s])' % ' '.join(map(str, xs))
+        return to_python(Interpreter.eval(PROGRAM + src))
+
+    assert add(40, 2) == eval_add(40) == 42
+    assert total(xs) == eval_total(0)
+    few = max(1, calls // 1000)
+    print '%-32s %12s %12s' % ('calls/s', 'eval', 'embed')
+    print '%-32s %12.0f %12.0f' % ('(add i 2)', rate(eval_add, calls),
+                                   rate(lambda i: add(i, 2), calls))
+    print '%-32s %12.1f %12.1f' % ('(total xs), %d elements' % size,
+                                   rate(eval_total, few),
+                                   rate(lambda i: total(xs), few))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+foreign function benchmark: a dot product and a distance computed in yin,
+with a scalar python primitive called per element, and with a vectorized
+python primitive called once on the whole vectors
+
+usage: python benchmarks/ffi_kernels.py [vector size]
+"""
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from ffi import register
+from interpreter import Interpreter
+
+register('mul', lambda x, y: x * y, ['Float', 'Float'], 'Float')
+register('dot', lambda xs, ys: sum(x * y for x, y in zip(xs, ys)),
+         ['Float', 'Float'], 'Float', vectorized=True)
+register('hypot', math.hypot, ['Float', 'Float'], 'Float')
+register('hypot*', lambda xs, ys: map(math.hypot, xs, ys),
+         ['Float', 'Float'], 'Float', vectorized=True)
+
+SETUP = """
+(define xs (map (fun (i) (* 0.5 i)) (range %d)))
+(define ys (map (fun (i) (* 0.25 i)) (range %d)))
+"""
+
+KERNELS = [
+    ('dot', 'yin', '(reduce + 0.0 (map * xs ys))'),
+    ('dot', 'scalar', '(reduce + 0.0 (map mul xs ys))'),
+    ('dot', 'vectorized', '(dot xs ys)'),
+    # yin has no square root, its version only sums the squares
+    ('hypot', 'yin', '(map (fun (x y) (+ (* x x) (* y y))) xs ys)'),
+    ('hypot', 'scalar', '(map hypot xs ys)'),
+    ('hypot', 'vectorized', '(hypot* xs ys)'),
+]
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    i = Interpreter('<bench>', SETUP % (size, size))
+    i.interp()
+    tbl = i.tbl
+    print '%d elements' % size
+    for kernel, how, src in KERNELS:
+        node = Interpreter('<bench>', src).parse()
+        start = time.time()
+        node.interp_statements(tbl)
+        print '%-8s %-12s %8.3f s' % (kernel, how, time.time() - start)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+front-end throughput benchmark
+
+generates corpora with gen_corpus.py while varying one shape parameter and
+reports lexer tokens/s, parser nodes/s and peak RSS for each, then fits
+time ~ size^k over the sweep. k close to 1 is linear; a larger exponent
+points at a nonlinear hot spot in lexer.py or parser.py. Each measurement
+runs in a fresh process, so the peak RSS belongs to that input only.
+
+usage: python benchmarks/frontend.py [--vary size|depth|width|ident-len|unicode]
+                                     [--values 64k,256k,1M] [--size 256k] ...
+"""
+import os
+import sys
+import math
+import time
+import resource
+import argparse
+import threading
+import multiprocessing
+from StringIO import StringIO
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+from gen_corpus import CorpusGenerator, parse_size
+from harness import Replay
+
+DEFAULT_VALUES = {
+    'size': '64k,256k,1M',
+    'depth': '2,4,8,16',
+    'width': '2,4,8,16',
+    'ident-len': '4,16,64,256',
+    'unicode': '0,0.5,1',
+}
+
+
+def measure(shape, size, queue):
+    from lexer import Lexer
+    from parser import Parser
+    from ast import walk
+
+    buf = StringIO()
+    CorpusGenerator(shape['depth'], shape['width'], shape['ident_len'],
+                    shape['unicode'], shape['seed']).generate(size, buf)
+    text = buf.getvalue().decode('utf8')
+    buf = None
+
+    start = time.time()
+    lex = Lexer('corpus', text)
+    tokens = []
+    tok = lex.next_token()
+    while tok:
+        tokens.append(tok)
+        tok = lex.next_token()
+    t_lex = time.time() - start
+
+    start = time.time()
+    p = Parser('corpus', text)
+    p.lex = Replay(tokens)
+    node = p.parse()
+    t_parse = time.time() - start
+
+    nodes = sum(1 for n in walk(node))
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss   # KB on linux
+    queue.put({'bytes': len(text.encode('utf8')), 'tokens': len(tokens),
+               'nodes': nodes, 'lex': t_lex, 'parse': t_parse, 'rss': rss})
+
+
+def measure_deep(shape, size, queue):
+    """
+    the parser recurses once per nesting level, give it a big stack
+    """
+    sys.setrecursionlimit(1000000)
+    threading.stack_size(512 << 20)
+    t = threading.Thread(target=measure, args=(shape, size, queue))
+    t.start()
+    t.join()
+
+
+def run_isolated(shape, size):
+    queue = multiprocessing.Queue()
+    proc = multiprocessing.Process(target=measure_deep,
+                                   args=(shape, size, queue))
+    proc.start()
+    proc.join()
+    if proc.exitcode != 0 or queue.empty():
+        raise RuntimeError('measurement process failed (exit code %s)'
+                           % proc.exitcode)
+    return queue.get()
+
+
+def slope(xs, ys):
+    """
+    least squares slope of log(ys) against log(xs)
+    """
+    lx = [math.log(x) for x in xs]
+    ly = [math.log(max(y, 1e-9)) for y in ys]
+    mx = sum(lx) / len(lx)
+    my = sum(ly) / len(ly)
+    den = sum((x - mx) ** 2 for x in lx)
+    if den == 0:
+        return float('nan')
+    return sum((x - mx) * (y - my) for x, y in zip(lx, ly)) / den
+
+
+def main():
+    ap = argparse.ArgumentParser(description='lexer/parser throughput')
+    ap.add_argument('--vary', default='size', choices=sorted(DEFAULT_VALUES))
+    ap.add_argument('--values', help='comma separated values to sweep')
+    ap.add_argument('--size', type=parse_size, default=parse_size('256k'))
+    ap.add_argument('--depth', type=int, default=4)
+    ap.add_argument('--width', type=int, default=3)
+    ap.add_argument('--ident-len', type=int, default=6)
+    ap.add_argument('--unicode', type=float, default=0.0)
+    ap.add_argument('--seed', type=int, default=0)
+    opts = ap.parse_args()
+
+    values = (opts.values or DEFAULT_VALUES[opts.vary]).split(',')
+    print '%-10s %10s %10s %10s %12s %12s %10s' % \
+        (opts.vary, 'bytes', 'tokens', 'nodes', 'tokens/s', 'nodes/s',
+         'rss(MB)')
+    rows = []
+    for v in values:
+        shape = {'depth': opts.depth, 'width': opts.width,
+                 'ident_len': opts.ident_len, 'unicode': opts.unicode,
+                 'seed': opts.seed}
+        size = opts.size
+        if opts.vary == 'size':
+            size = parse_size(v)
+        elif opts.vary == 'unicode':
+            shape['unicode'] = float(v)
+        else:
+            shape[opts.vary.replace('-', '_')] = int(v)
+        r = run_isolated(shape, size)
+        rows.append(r)
+        print '%-10s %10d %10d %10d %12.0f %12.0f %10.1f' % \
+            (v, r['bytes'], r['tokens'], r['nodes'], r['tokens'] / r['lex'],
+             r['nodes'] / r['parse'], r['rss'] / 1024.0)
+
+    if len(rows) > 1:
+        if opts.vary == 'size':
+            xs = [r['bytes'] for r in rows]
+            for phase in ('lex', 'parse'):
+                k = slope(xs, [r[phase] for r in rows])
+                note = '  nonlinear!' if k > 1.2 else ''
+                print '%-6s time ~ bytes^%.2f%s' % (phase, k, note)
+        else:
+            # the cost per byte should not depend on the shape
+            xs = [float(v) or 1e-3 for v in values]
+            for phase in ('lex', 'parse'):
+                k = slope(xs, [r[phase] / r['bytes'] for r in rows])
+                note = '  nonlinear!' if k > 0.2 else ''
+                print '%-6s time/byte ~ %s^%.2f%s' % (phase, opts.vary, k, note)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+synthetic corpus generator for front-end throughput tests
+
+writes syntactically valid yin source of a given size and shape: top-level
+defines of functions and data whose bodies are expression trees of calls,
+ifs, vector and record literals, numbers, strings, names and comments.
+
+usage: python benchmarks/gen_corpus.py --size 10M --depth 6 --width 4
+                                       --ident-len 8 --unicode 0.1 out.yin
+"""
+import sys
+import random
+import argparse
+
+ASCII = 'abcdefghijklmnopqrstuvwxyz'
+UNICODE = u'你我他她它们的是不了在人有这中大为上个国和地到以说时要就出会可也'
+
+
+class CorpusGenerator(object):
+    def __init__(self, depth=4, width=3, ident_len=6, unicode_ratio=0.0,
+                 seed=0):
+        self.depth = depth
+        self.width = width
+        self.ident_len = ident_len
+        self.unicode_ratio = unicode_ratio
+        self.rand = random.Random(seed)
+        self.count = 0
+
+    def ident(self):
+        r = self.rand
+        if r.random() < self.unicode_ratio:
+            chars = UNICODE
+        else:
+            chars = ASCII
+        n = max(1, int(r.gauss(self.ident_len, self.ident_len / 4.0)))
+        name = ''.join(r.choice(chars) for i in xrange(n))
+        if r.random() < 0.3:
+            name = name[:n // 2] + '-' + name[n // 2:]
+        return name.strip('-') or 'x'
+
+    def leaf(self):
+        r = self.rand
+        k = r.random()
+        if k < 0.3:
+            return str(r.randint(0, 1 << 20))
+        elif k < 0.4:
+            return '%d.%d' % (r.randint(0, 999), r.randint(0, 999))
+        elif k < 0.5:
+            return '0x%X' % r.randint(0, 1 << 24)
+        elif k < 0.6:
+            return u'"%s %s"' % (self.ident(), self.ident())
+        elif k < 0.65:
+            return r.choice(['true', 'false'])
+        else:
+            return self.ident()
+
+    def expr(self, depth):
+        """
+        an expression nested depth levels deep; only one element of each
+        form goes deeper, so the size grows with depth * width
+        """
+        r = self.rand
+        if depth <= 0:
+            return self.leaf()
+        kids = [self.leaf() for i in xrange(self.width - 1)]
+        kids.insert(r.randint(0, len(kids)), self.expr(depth - 1))
+        k = r.random()
+        if k < 0.5:
+            return u'(%s %s)' % (self.ident(), ' '.join(kids))
+        elif k < 0.65:
+            return u'(if %s)' % ' '.join((kids * 3)[:3])
+        elif k < 0.85:
+            return u'[%s]' % ' '.join(kids)
+        else:
+            pairs = [u':%s %s' % (self.ident(), v) for v in kids]
+            return u'{%s}' % ' '.join(pairs)
+
+    def form(self):
+        r = self.rand
+        self.count += 1
+        name = u'%s%d' % (self.ident(), self.count)
+        k = r.random()
+        if k < 0.1:
+            return u'-- %s %s\n' % (self.ident(), self.ident())
+        elif k < 0.6:
+            params = ' '.join(u'%s%d' % (self.ident(), i)
+                              for i in xrange(self.width))
+            return u'(define %s\n  (fun (%s)\n    %s))\n' % \
+                (name, params, self.expr(self.depth))
+        else:
+            return u'(define %s %s)\n' % (name, self.expr(self.depth))
+
+    def generate(self, size, out):
+        """
+        write forms to out until at least size bytes were written
+        """
+        written = 0
+        while written < size:
+            data = self.form().encode('utf8')
+            out.write(data)
+            written += len(data)
+        return written
+
+
+def parse_size(ss):
+    units = {'k': 1 << 10, 'm': 1 << 20, 'g': 1 << 30}
+    ss = ss.lower().rstrip('b')
+    if ss and ss[-1] in units:
+        return int(float(ss[:-1]) * units[ss[-1]])
+    return int(ss)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='generate yin source')
+    ap.add_argument('output', nargs='?', help='output file (default: stdout)')
+    ap.add_argument('--size', type=parse_size, default=parse_size('1M'),
+                    help='approximate size, e.g. 64k, 10M (default: 1M)')
+    ap.add_argument('--depth', type=int, default=4, help='expression nesting')
+    ap.add_argument('--width', type=int, default=3, help='elements per form')
+    ap.add_argument('--ident-len', type=int, default=6,
+                    help='mean identifier length')
+    ap.add_argument('--unicode', type=float, default=0.0,
+                    help='fraction of non-ascii identifiers')
+    ap.add_argument('--seed', type=int, default=0)
+    opts = ap.parse_args()
+
+    gen = CorpusGenerator(opts.depth, opts.width, opts.ident_len,
+                          opts.unicode, opts.seed)
+    if opts.output:
+        with open(opts.output, 'wb') as out:
+            gen.generate(opts.size, out)
+    else:
+        gen.generate(opts.size, sys.stdout)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,173 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+benchmark harness
+
+times the lex, parse and eval phases of each benchmark program separately
+over repeated runs and reports the median and variance.
+
+usage:
+    python benchmarks/harness.py run [--repeat N] [--output out.json]
+                                     [--root CHECKOUT] [prog.yin ...]
+    python benchmarks/harness.py compare base.json new.json [--threshold 0.1]
+
+--root runs the interpreter of another checkout, so two checkouts can be
+compared with the same programs; compare exits with status 1 when a
+phase's median got slower than the threshold allows.
+"""
+import os
+import sys
+import glob
+import json
+import time
+import argparse
+import platform
+import subprocess
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+PHASES = ('lex', 'parse', 'eval')
+
+
+class Replay(object):
+    """
+    feeds pre-lexed tokens to the parser, so parsing is timed without lexing
+    """
+    def __init__(self, tokens):
+        self.tokens = iter(tokens)
+
+    def next_token(self):
+        return next(self.tokens, False)
+
+
+def median(xs):
+    xs = sorted(xs)
+    n = len(xs)
+    if n % 2:
+        return xs[n // 2]
+    return (xs[n // 2 - 1] + xs[n // 2]) / 2.0
+
+
+def variance(xs):
+    if len(xs) < 2:
+        return 0.0
+    mean = sum(xs) / float(len(xs))
+    return sum((x - mean) ** 2 for x in xs) / (len(xs) - 1)
+
+
+def time_once(fname, text):
+    from lexer import Lexer
+    from parser import Parser
+    from environment import SymTable
+
+    start = time.time()
+    lex = Lexer(fname, text)
+    tokens = []
+    tok = lex.next_token()
+    while tok:
+        tokens.append(tok)
+        tok = lex.next_token()
+    t_lex = time.time() - start
+
+    start = time.time()
+    p = Parser(fname, text)
+    p.lex = Replay(tokens)
+    node = p.parse()
+    t_parse = time.time() - start
+
+    stdout = sys.stdout
+    sys.stdout = open(os.devnull, 'w')
+    try:
+        start = time.time()
+        node.interp(SymTable.init_value_table())
+        t_eval = time.time() - start
+    finally:
+        sys.stdout.close()
+        sys.stdout = stdout
+    return t_lex, t_parse, t_eval
+
+
+def git_revision(root):
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=root,
+                                       stderr=open(os.devnull, 'w')).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(opts):
+    root = os.path.abspath(opts.root)
+    sys.path.insert(0, root)
+    from util import read_file
+
+    files = opts.files or sorted(glob.glob(os.path.join(HERE, '*.yin')))
+    results = {}
+    for fname in files:
+        text = read_file(fname)
+        name = os.path.splitext(os.path.basename(fname))[0]
+        time_once(fname, text)      # warm up
+        runs = [time_once(fname, text) for i in range(opts.repeat)]
+        results[name] = {}
+        for i, phase in enumerate(PHASES):
+            xs = [r[i] for r in runs]
+            results[name][phase] = {'median': median(xs),
+                                    'variance': variance(xs),
+                                    'min': min(xs), 'runs': xs}
+        print '%-14s' % name + ''.join(
+            '  %s %9.3fms' % (phase, results[name][phase]['median'] * 1e3)
+            for phase in PHASES)
+
+    if opts.output:
+        meta = {'root': root, 'revision': git_revision(root),
+                'python': platform.python_version(), 'time': time.time(),
+                'repeat': opts.repeat}
+        with open(opts.output, 'w') as fp:
+            json.dump({'meta': meta, 'results': results}, fp, indent=2)
+
+
+def compare(opts):
+    with open(opts.base) as fp:
+        base = json.load(fp)['results']
+    with open(opts.new) as fp:
+        new = json.load(fp)['results']
+
+    regressions = 0
+    for name in sorted(set(base) & set(new)):
+        for phase in PHASES:
+            b = base[name][phase]['median']
+            n = new[name][phase]['median']
+            ratio = n / b if b else 1.0
+            flag = ''
+            if ratio > 1 + opts.threshold:
+                flag = '  REGRESSION'
+                regressions += 1
+            print '%-14s %-6s %9.3fms -> %9.3fms  %6.2fx%s' % \
+                (name, phase, b * 1e3, n * 1e3, ratio, flag)
+    sys.exit(1 if regressions else 0)
+
+
+def main():
+    ap = argparse.ArgumentParser(description='yin benchmark harness')
+    sub = ap.add_subparsers()
+
+    r = sub.add_parser('run', help='time the benchmark programs')
+    r.add_argument('files', nargs='*')
+    r.add_argument('--repeat', type=int, default=10)
+    r.add_argument('--output', help='save the results as JSON')
+    r.add_argument('--root', default=os.path.join(HERE, os.pardir),
+                   help='checkout of the interpreter to benchmark')
+    r.set_defaults(func=run)
+
+    c = sub.add_parser('compare', help='compare two result files')
+    c.add_argument('base')
+    c.add_argument('new')
+    c.add_argument('--threshold', type=float, default=0.1,
+                   help='allowed slowdown of a median (default: %(default)s)')
+    c.set_defaults(func=compare)
+
+    opts = ap.parse_args()
+    opts.func(opts)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+hash-consing benchmark: node objects and peak RSS of parsing a large
+repetitive program (the same few definitions over and over, like generated
+code) with and without shared nodes (Parser(share=True)), each in a fresh
+process, and the time of comparing equal string literals
+
+usage: python benchmarks/hashcons.py [definitions]
+"""
+import os
+import resource
+import subprocess
+import sys
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+
+TEMPLATE = """
+(define handler-%d
+  (fun (request limit)
+    (if (< request.size limit)
+        {:status 200 :headers ["content-type" "text/plain"] :body "ok"}
+        {:status 413 :headers ["content-type" "text/plain"] :body "too large"})))
+(define route-%d ["GET" "/api/v1/items" handler-%d [0 1 2 3]])
+"""
+
+# a long literal compared with itself: a pointer comparison once shared
+EQUAL = """
+(define f (fun (i) (= "%s" "%s")))
+(print (length (filter f (range 100000))))
+"""
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(share, count):
+    """
+    in the child process: prints the node objects and the RSS in KB
+    """
+    from parser import Parser
+    from ast import walk
+    text = ''.join(TEMPLATE % (i, i, i) for i in xrange(count))
+    before = rss()
+    node = Parser('<bench>', text, share=share).parse()
+    nodes = len(set(map(id, walk(node))))
+    print nodes, rss() - before
+
+
+def measure(share, count):
+    out = subprocess.check_output([sys.executable, __file__, '--run',
+                                   str(int(share)), str(count)])
+    return map(int, out.split())
+
+
+def equal_time(share):
+    from parser import Parser
+    from environment import SymTable
+    s = 'x' * 10000
+    node = Parser('<bench>', EQUAL % (s, s), share=share).parse()
+    devnull = open(os.devnull, 'w')
+    out, sys.stdout = sys.stdout, devnull
+    start = time.time()
+    node.interp_statements(SymTable.init_value_table())
+    sys.stdout = out
+    return time.time() - start
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    print 'parse %d definitions' % (2 * count)
+    print '%-10s %12s %12s %12s' % ('', 'nodes', 'RSS', '(= s s)')
+    for share in (False, True):
+        nodes, kb = measure(share, count)
+        print '%-10s %12d %9d KB %10.3f s' % (
+            'shared' if share else 'plain', nodes, kb, equal_time(share))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run(bool(int(sys.argv[2])), int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,60 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+image benchmark: start a script by evaluating its prologue vs by loading an
+image saved after the prologue
+
+usage: python benchmarks/image_startup.py [defines] [table size]
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+import image
+
+WORK = '(print (f0 (length table)))\n'
+
+
+def prologue(n, size):
+    lines = ['(define table (map (fun (i) {:id i :sq (* i i)}) (range %d)))'
+             % size]
+    for i in xrange(n):
+        lines.append('(define f%d (fun (x) (+ x %d)))' % (i, i))
+    return '\n'.join(lines) + '\n'
+
+
+def timed(fn):
+    start = time.time()
+    fn()
+    return time.time() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    size = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    setup = prologue(n, size)
+    fd, path = tempfile.mkstemp(suffix='.img')
+    os.close(fd)
+    try:
+        cold = timed(lambda: Interpreter('<bench>', setup + WORK).interp())
+        i = Interpreter('<bench>', setup)
+        i.interp()
+        save = timed(lambda: image.save(i.tbl, path))
+        warm = timed(lambda: Interpreter('<bench>', WORK, image=path).interp())
+        print '%d defines, table of %d records, image %d bytes' % (
+            n, size, os.path.getsize(path))
+        print '%-28s %8.3f s' % ('evaluate prologue + work', cold)
+        print '%-28s %8.3f s' % ('save image', save)
+        print '%-28s %8.3f s' % ('load image + work', warm)
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+memory benchmark: peak RSS of parsing a large program (tokens and nodes)
+and of evaluating a program that builds large data (values and tables),
+each in a fresh process
+
+usage: python benchmarks/memory.py [corpus size] [records]
+"""
+import os
+import resource
+import subprocess
+import sys
+from cStringIO import StringIO
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(HERE, os.pardir))
+sys.path.insert(0, HERE)
+
+DATA = """
+(define make (fun (i) {:id i :name "record" :pos [i (* 2 i) 0.5]}))
+(define table (map make (range %d)))
+(print (length table))
+"""
+
+
+def rss():
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def run(what, arg):
+    """
+    in the child process: prints the peak RSS in KB before and after
+    """
+    from parser import Parser
+    from lexer import Lexer
+    from environment import SymTable
+    if what == 'parse':
+        from gen_corpus import CorpusGenerator
+        out = StringIO()
+        CorpusGenerator().generate(arg, out)
+        text = out.getvalue().decode('utf8')
+        before = rss()
+        tokens = Lexer('<bench>', text).tokenize()
+        node = Parser('<bench>', tokens=tokens).parse()
+    else:
+        node = Parser('<bench>', DATA % arg).parse()
+        before = rss()
+        devnull = open(os.devnull, 'w')
+        out, sys.stdout = sys.stdout, devnull
+        node.interp_statements(SymTable.init_value_table())
+        sys.stdout = out
+    print before, rss()
+
+
+def measure(what, arg):
+    out = subprocess.check_output([sys.executable, __file__, '--run',
+                                   what, str(arg)])
+    before, after = map(int, out.split())
+    return after - before
+
+
+def main():
+    from gen_corpus import parse_size
+    size = parse_size(sys.argv[1]) if len(sys.argv) > 1 else parse_size('512k')
+    records = int(sys.argv[2]) if len(sys.argv) > 2 else 100000
+    print '%-40s %10d KB' % ('tokenize + parse %d bytes' % size,
+                             measure('parse', size))
+    print '%-40s %10d KB' % ('build %d records' % records,
+                             measure('data', records))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) == 4 and sys.argv[1] == '--run':
+        run(sys.argv[2], int(sys.argv[3]))
+    else:
+        main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+profile-guided specialization benchmark: each program is run once with a
+pgo.Recorder, then timed as parsed and as rewritten with the profile
+
+usage: python benchmarks/pgo_specialize.py [repeat]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from pgo import Recorder
+from output import Sink
+
+PROGRAMS = [
+    ('fib', """
+(define fib (fun (n) (if (< n 2) n (+ (fib (- n 1)) (fib (- n 2))))))
+(print (fib 20))
+"""),
+    ('helpers', """
+(define square (fun (x) (* x x)))
+(define norm (fun (x y) (+ (square x) (square y))))
+(define step (fun (acc i) (+ acc (norm i (- i 1)))))
+(print (reduce step 0 (range 50000)))
+"""),
+    ('floats', """
+(define lerp (fun (a b t) (+ a (* t (- b a)))))
+(define f (fun (i) (lerp 0.0 10.0 (/ i 1000.0))))
+(print (reduce + 0.0 (map f (range 50000))))
+"""),
+]
+
+
+def timed(text, repeat, **opts):
+    best = None
+    for i in xrange(repeat):
+        start = time.time()
+        Interpreter('<bench>', text, output=Sink(), **opts).interp()
+        t = time.time() - start
+        best = t if best is None else min(best, t)
+    return best
+
+
+def main():
+    repeat = int(sys.argv[1]) if len(sys.argv) > 1 else 3
+    print '%-10s %10s %10s %8s' % ('', 'plain', 'pgo', 'speedup')
+    for name, text in PROGRAMS:
+        recorder = Recorder()
+        Interpreter('<bench>', text, output=Sink(), recorder=recorder).interp()
+        profile = recorder.profile()
+        plain = timed(text, repeat)
+        pgo = timed(text, repeat, pgo=profile)
+        print '%-10s %8.3f s %8.3f s %7.2fx' % (name, plain, pgo, plain / pgo)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+pmap benchmark: time of map and of pmap with 1, 2, 4 ... workers on a
+CPU-bound function
+
+usage: python benchmarks/pmap_scaling.py [elements] [work per element]
+"""
+import multiprocessing
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+
+PROGRAM = """
+(define work (fun (x) (reduce + 0 (range (+ x %(work)d)))))
+(define xs (range %(n)d))
+%(call)s
+"""
+
+
+def timed(call, n, work):
+    text = PROGRAM % dict(n=n, work=work, call=call)
+    start = time.time()
+    Interpreter('<bench>', text).interp()
+    return time.time() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 64
+    work = int(sys.argv[2]) if len(sys.argv) > 2 else 20000
+    base = timed('(map work xs)', n, work)
+    print '%d elements, %d cores' % (n, multiprocessing.cpu_count())
+    print '%-12s %8.3f s' % ('map', base)
+    workers = 1
+    while workers <= max(4, multiprocessing.cpu_count()):
+        t = timed('(pmap work xs 1 %d)' % workers, n, work)
+        print '%-12s %8.3f s %6.2fx' % ('pmap x%d' % workers, t, base / t)
+        workers *= 2
+
+
+if __name__ == '__main__':
+    main()
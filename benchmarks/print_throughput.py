@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+print benchmark: lines per second of the print primitive, writing to a
+file, to an unbuffered file (as under python -u) and
+to a StringIO (how worker.py used to capture output), with no sink
+(a write per line, as print used to do), a sink flushed after each line
+and the default buffered sink
+
+usage: python benchmarks/print_throughput.py [lines]
+"""
+import os
+import sys
+import time
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from values import Print, StrValue, IntValue
+from output import Sink
+import output
+
+
+def timed(lines, target, policy):
+    args = [StrValue('line '), IntValue(42), StrValue(' of output')]
+    apply = Print().apply
+    out, sys.stdout = sys.stdout, target
+    sink = Sink(target, policy) if policy else None
+    saved = output.install(sink)
+    start = time.time()
+    try:
+        for i in xrange(lines):
+            apply(args)
+        if sink is not None:
+            sink.flush()
+    finally:
+        output.install(saved)
+        sys.stdout = out
+    return time.time() - start
+
+
+def main():
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    print '%d lines' % lines
+    for name, make in (('file', lambda: open(os.devnull, 'w')),
+                       ('unbuffered', lambda: open(os.devnull, 'w', 0)),
+                       ('StringIO', StringIO)):
+        for policy in (None, 'line', 'size'):
+            t = timed(lines, make(), policy)
+            print '%-12s %-8s %8.3f s %12.0f lines/s' % (
+                name, policy or 'no sink', t, lines / t)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+measure the run time overhead of the function profiler
+
+usage: python benchmarks/profile_overhead.py [n]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from profiler import Profiler
+
+PROGRAM = """
+(define fib
+  (fun (n)
+    (if (< n 2)
+        n
+        (+ (fib (- n 1)) (fib (- n 2))))))
+(fib %d)
+"""
+
+
+def run(n, profiler=None):
+    start = time.time()
+    Interpreter("fib", PROGRAM % n, profiler=profiler).interp()
+    return time.time() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    base = min(run(n) for i in range(3))
+    prof = min(run(n, Profiler()) for i in range(3))
+    print "%-12s %8.3fs" % ('plain', base)
+    print "%-12s %8.3fs" % ('profiled', prof)
+    print "%-12s %8.2fx" % ('overhead', prof / base)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+request latency of the interpreter server against cold-process execution
+
+usage: python benchmarks/server_latency.py [file.yin] [iterations]
+"""
+import os
+import sys
+import time
+import tempfile
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+sys.path.insert(0, ROOT)
+
+from client import Client
+
+
+def median(xs):
+    xs = sorted(xs)
+    return xs[len(xs) // 2]
+
+
+def cold(path, n):
+    times = []
+    with open(os.devnull, 'w') as null:
+        for i in xrange(n):
+            start = time.time()
+            subprocess.check_call([sys.executable,
+                                   os.path.join(ROOT, 'interpreter.py'), path],
+                                  stdout=null)
+            times.append(time.time() - start)
+    return times
+
+
+def warm(path, n):
+    sock = os.path.join(tempfile.mkdtemp(), 'yin.sock')
+    server = subprocess.Popen([sys.executable, os.path.join(ROOT, 'server.py'),
+                               '--socket', sock, '--workers', '1'])
+    try:
+        while not os.path.exists(sock):
+            time.sleep(0.05)
+        client = Client(sock)
+        client.run_file(path)       # first job warms the worker
+        times = []
+        for i in xrange(n):
+            start = time.time()
+            client.run_file(path)
+            times.append(time.time() - start)
+        client.close()
+        return times
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else \
+        os.path.join(ROOT, 'tests', 'parser.yin')
+    n = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    path = os.path.abspath(path)
+
+    c = median(cold(path, n))
+    w = median(warm(path, n))
+    print "%-24s %10.2f ms" % ('cold process', c * 1e3)
+    print "%-24s %10.2f ms" % ('server request', w * 1e3)
+    print "%-24s %10.1fx" % ('speedup', c / w)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+startup benchmark: time per Interpreter.eval("1")
+
+usage: python benchmarks/startup.py [iterations]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from environment import SymTable
+
+
+def bench(fn, n):
+    start = time.time()
+    for i in xrange(n):
+        fn()
+    return (time.time() - start) / n
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    Interpreter.eval("1")       # warm up the prelude
+
+    per_eval = bench(lambda: Interpreter.eval("1"), n)
+    per_env = bench(SymTable.init_value_table, n)
+    per_build = bench(SymTable.build_value_table, n)
+
+    print "%-36s %10.2f us" % ('Interpreter.eval("1")', per_eval * 1e6)
+    print "%-36s %10.2f us" % ('init_value_table (shared prelude)', per_env * 1e6)
+    print "%-36s %10.2f us" % ('build_value_table (from scratch)', per_build * 1e6)
+
+
+if __name__ == '__main__':
+    main()
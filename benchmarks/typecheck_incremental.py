@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+incremental type checking benchmark: time to re-check a program of many
+top-level defines after a one-line change
+
+usage: python benchmarks/typecheck_incremental.py [defines] [processes]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from type_checker import TypeChecker
+
+
+def program(n, seed=0):
+    """
+    n defines, each one a function of up to two random earlier ones
+    """
+    rnd = random.Random(seed)
+    lines = ['(define f0 (fun ((x Int)) (+ x 1)))']
+    for i in xrange(1, n):
+        deps = set(rnd.randrange(i) for _ in xrange(rnd.randint(1, 2)))
+        calls = ' '.join('(f%d x)' % d for d in sorted(deps))
+        lines.append('(define f%d (fun ((x Int)) (+ %s %d)))' % (i, calls, i))
+    lines.append('(f%d 1)' % (n - 1))
+    return lines
+
+
+def timed(checker, lines):
+    start = time.time()
+    checker.check_incremental('\n'.join(lines) + '\n')
+    return time.time() - start, checker.checked
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    processes = int(sys.argv[2]) if len(sys.argv) > 2 else None
+    lines = program(n)
+    mid = n / 2
+
+    rows = []
+    serial = TypeChecker('<bench>', processes=1)
+    rows.append(('full check, serial',) + timed(serial, lines))
+
+    checker = TypeChecker('<bench>', processes=processes)
+    rows.append(('full check, pool',) + timed(checker, lines))
+    rows.append(('re-check, no change',) + timed(checker, lines))
+
+    # same type: only the edited define is checked again
+    lines[mid] = lines[mid].replace('%d)))' % mid, '%d)))' % (mid + 1))
+    rows.append(('re-check, one-line change',) + timed(checker, lines))
+
+    # a new result type invalidates everything that depends on it
+    lines[mid] = lines[mid].replace('%d)))' % (mid + 1), '0.5)))')
+    rows.append(('re-check, type change',) + timed(checker, lines))
+    checker.close()
+
+    print '%d defines' % n
+    for name, secs, checked in rows:
+        print '%-28s %8.3f s %8d checked' % (name, secs, checked)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+thin client for the interpreter server
+
+usage: python client.py [--socket PATH] file.yin ...
+       python client.py [--socket PATH] -e "(print 1)"
+"""
+import os
+import sys
+import json
+import socket
+import argparse
+
+DEFAULT_SOCKET = '/tmp/yin.sock'
+
+
+class Client(object):
+    def __init__(self, path=DEFAULT_SOCKET):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.connect(path)
+        self.rfile = self.sock.makefile('rb')
+
+    def request(self, req):
+        self.sock.sendall(json.dumps(req) + '\n')
+        return json.loads(self.rfile.readline())
+
+    def run_file(self, path):
+        return self.request({'path': os.path.abspath(path)})
+
+    def run_text(self, text, name='stdin'):
+        return self.request({'text': text, 'name': name})
+
+    def close(self):
+        self.rfile.close()
+        self.sock.close()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='yin interpreter client')
+    ap.add_argument('--socket', default=DEFAULT_SOCKET)
+    ap.add_argument('-e', dest='text', help='evaluate this source text')
+    ap.add_argument('files', nargs='*')
+    opts = ap.parse_args()
+
+    client = Client(opts.socket)
+    if opts.text is not None:
+        resps = [client.run_text(opts.text)]
+    else:
+        resps = [client.run_file(f) for f in opts.files]
+    client.close()
+
+    status = 0
+    for resp in resps:
+        sys.stdout.write(resp['output'].encode('utf8'))
+        if resp['error']:
+            sys.stderr.write(resp['error'].encode('utf8'))
+            status = 1
+    sys.exit(status)
+
+
+if __name__ == '__main__':
+    main()
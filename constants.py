@@ -4,6 +4,8 @@
 """
 constants
 """
+import threading
+
 ################# global constants ############
 COMMENT_PREFIX = '--'
 STRING_BEGIN = "\""
@@ -16,6 +18,7 @@ FUN_KW = 'fun'
 DEFINE_KW = 'define'
 ASSIGN_KW = 'set!'
 SEQ_KW = 'seq'
+IMPORT_KW = 'import'
 
 TRUE_KW = 'true'
 FALSE_KW = 'false'
@@ -39,7 +42,18 @@ KEYWORD_PREFIX = ':'
 
 QUOTE_PREFIX = "'"
 
-callstack = []
+class CallStack(threading.local):
+    """
+    the call nodes being evaluated (frames), one stack per thread: the
+    programs started by interp_async run on threads of their own.
+    callback_depth is the length of frames while a primitive that calls
+    back (map, filter...) is the innermost call, 0 otherwise
+    """
+    def __init__(self):
+        self.frames = []
+        self.callback_depth = 0
+
+callstack = CallStack()
 
 def is_delimeter(ss):
     return ss == PAREN_BEGIN or\
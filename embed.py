@@ -0,0 +1,182 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+embedding yin in python
+
+a Program is evaluated once; its functions are then called from python
+without building or parsing source text:
+
+    prog = Program('stats.yin')
+    mean = prog.function('mean')
+    mean([1, 2, 3.5])               # => 2.1666...
+    prog['table']                   # a global, converted to python
+
+python values are converted with to_yin and results with to_python:
+
+    int, long   IntValue            list, tuple   VectorValue
+    float       FloatValue          dict          RecordLiteralValue
+    bool        BoolValue           None          None
+    str         StrValue            a yin function Function
+    unicode     StrValue
+
+a list whose elements all have the same scalar type is converted in one
+pass over it (map), and so is a vector of numbers, booleans or strings.
+
+a program that fails to load and a call that fails raise EmbedError with
+the message (and position) of the yin error.
+"""
+import sys
+
+from interpreter import Interpreter
+from output import Sink
+from values import (Value, BoolValue, IntValue, FloatValue, StrValue,
+                    VectorValue, RecordLiteralValue, Closure, PrimitiveFun,
+                    apply_fun)
+from error import EmbedError, FatalError, InterpError
+from constants import callstack
+import output
+
+
+class Program(object):
+    def __init__(self, fname, text=None, image=None, output=None):
+        self.fname = fname
+        self.output = output if output is not None else Sink(sys.stdout)
+        i = Interpreter(fname, text, image=image, output=self.output)
+        depth = len(callstack.frames)
+        try:
+            i.interp()
+        except FatalError, e:
+            raise EmbedError(fname, e.msg)
+        except InterpError, e:
+            raise EmbedError(fname, str(e))
+        finally:
+            del callstack.frames[depth:]
+        self.tbl = i.tbl
+
+    def lookup(self, name):
+        """
+        the yin value bound to name in the global table
+        """
+        v = self.tbl.lookup_value(name)
+        if v is None:
+            raise KeyError(name)
+        return v
+
+    def __getitem__(self, name):
+        return to_python(self.lookup(name), self)
+
+    def __setitem__(self, name, value):
+        self.tbl.put_value(name, to_yin(value))
+
+    def function(self, name):
+        f = self.lookup(name)
+        if not isinstance(f, (Closure, PrimitiveFun)):
+            raise EmbedError(name, 'not a function')
+        return Function(name, f, self)
+
+    def call(self, name, *args):
+        return self.function(name)(*args)
+
+
+class Function(object):
+    """
+    a yin function callable from python
+    """
+    __slots__ = ('name', 'fun', 'program')
+
+    def __init__(self, name, fun, program):
+        self.name = name
+        self.fun = fun
+        self.program = program
+
+    def __call__(self, *args):
+        return to_python(self.apply(map(to_yin, args)), self.program)
+
+    def apply(self, args):
+        """
+        call on yin values, returns a yin value
+        """
+        saved = output.install(self.program.output)
+        depth = len(callstack.frames)
+        try:
+            return apply_fun(self.name, self.fun, args)
+        except FatalError, e:
+            raise EmbedError(self.name, e.msg)
+        except InterpError, e:
+            raise EmbedError(self.name, str(e))
+        finally:
+            del callstack.frames[depth:]
+            self.program.output.flush()
+            output.install(saved)
+
+    def __repr__(self):
+        return '<yin function %s>' % self.name
+
+
+############ marshalling ####################
+SCALARS = {
+    int: IntValue,
+    long: IntValue,
+    float: FloatValue,
+    bool: BoolValue,
+    str: StrValue,
+    unicode: StrValue,
+}
+
+# value classes whose python form is their value
+PLAIN = (IntValue, FloatValue, BoolValue, StrValue)
+
+
+def to_yin(x):
+    """
+    the yin value of the python value x
+    """
+    conv = SCALARS.get(type(x))
+    if conv is not None:
+        return conv(x)
+    if x is None or isinstance(x, Value):
+        return x
+    if isinstance(x, (list, tuple)):
+        return VectorValue(list_to_yin(x))
+    if isinstance(x, dict):
+        return RecordLiteralValue(dict((k, to_yin(v))
+                                       for k, v in x.iteritems()))
+    if isinstance(x, Function):
+        return x.fun
+    raise EmbedError(repr(x), 'cannot convert to yin')
+
+
+def list_to_yin(xs):
+    types = set(map(type, xs))
+    if len(types) == 1:
+        conv = SCALARS.get(types.pop())
+        if conv is not None:
+            return map(conv, xs)
+    return map(to_yin, xs)
+
+
+def to_python(v, program=None):
+    """
+    the python value of the yin value v, functions are wrapped in
+    Function when program is given
+    """
+    if isinstance(v, PLAIN):
+        return v.value
+    if v is None:
+        return None
+    if isinstance(v, VectorValue):
+        return list_to_python(v.values, program)
+    if isinstance(v, RecordLiteralValue):
+        return dict((k, to_python(x, program))
+                    for k, x in v.kv_map.iteritems())
+    if program is not None and isinstance(v, (Closure, PrimitiveFun)):
+        return Function(str(v), v, program)
+    raise EmbedError(str(v), 'cannot convert to python')
+
+
+def list_to_python(vs, program=None):
+    types = set(map(type, vs))
+    if len(types) == 1 and issubclass(types.pop(), PLAIN):
+        return [v.value for v in vs]
+    return [to_python(v, program) for v in vs]
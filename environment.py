@@ -6,6 +6,7 @@ Environments
 """
 from util import *
 from ast import *
+import ffi
 
 class SymTableError(Exception):
     def __init__(self, msg):
@@ -15,13 +16,28 @@ class SymTableError(Exception):
         return self.msg
 
 
+_value_prelude = None
+_type_prelude = None
+
+
 class SymTable(object):
     """
     Symbol Table
     """
+    __slots__ = ('parent', 'table', 'frozen')
+
     def __init__(self, parent=None):
         self.parent = parent
         self.table = {}
+        self.frozen = False
+
+    def freeze(self):
+        """
+        make the table immutable, it can then be shared by many
+        interpreters, writes go to the tables layered on top of it
+        """
+        self.frozen = True
+        return self
 
     def lookup_property_local(self, name, key):
         entry = self.table.get(name, {})
@@ -49,6 +65,8 @@ class SymTable(object):
         return self.lookup_property_local(name, "type")
 
     def put(self, name, k, v):
+        if self.frozen:
+            raise SymTableError("can't modify a frozen symbol table")
         entry = self.table.get(name, {})
         entry[k] = v
         self.table[name] = entry
@@ -61,7 +79,15 @@ class SymTable(object):
 
     def set(self, name, k, v):
         if self.lookup_property_local(name, k):
+            if self.frozen:
+                raise SymTableError("can't modify a frozen symbol table")
             self.table[name][k] = v
+        elif self.parent and self.parent.frozen and\
+             self.parent.lookup_property(name, k):
+            # copy on write, the shared prelude is never modified
+            entry = dict(self.parent.table.get(name, {}))
+            entry[k] = v
+            self.table[name] = entry
         elif self.parent:
             self.parent.set(name, k, v)
         else:
@@ -76,8 +102,43 @@ class SymTable(object):
     def __str__(self):
         return str(self.table) + str(self.parent)
 
+    @staticmethod
+    def prelude_value_table():
+        """
+        the process-wide prelude of primitives, built only once
+        """
+        global _value_prelude
+        if _value_prelude is None:
+            _value_prelude = SymTable.build_value_table().freeze()
+        return _value_prelude
+
+    @staticmethod
+    def prelude_type_table():
+        global _type_prelude
+        if _type_prelude is None:
+            _type_prelude = SymTable.build_type_table().freeze()
+        return _type_prelude
+
+    @staticmethod
+    def invalidate_prelude():
+        """
+        drop the cached preludes, e.g. after a primitive is registered
+        (ffi.py); tables created before keep the old ones
+        """
+        global _value_prelude, _type_prelude
+        _value_prelude = None
+        _type_prelude = None
+
     @staticmethod
     def init_value_table():
+        return SymTable(SymTable.prelude_value_table())
+
+    @staticmethod
+    def init_type_table():
+        return SymTable(SymTable.prelude_type_table())
+
+    @staticmethod
+    def build_value_table():
         tbl = SymTable()
         tbl.put_value('+', Add())
         tbl.put_value('-', Sub())
@@ -94,27 +155,47 @@ class SymTable(object):
 
         tbl.put_value('print', Print())
 
+        tbl.put_value('string-append', StrAppend())
+        tbl.put_value('substring', Substring())
+        tbl.put_value('string-length', StrLength())
+        tbl.put_value('string-join', StrJoin())
+        tbl.put_value('string-split', StrSplit())
+
+        tbl.put_value('range', Range())
+        tbl.put_value('length', Length())
+        tbl.put_value('map', Map())
+        tbl.put_value('filter', Filter())
+        tbl.put_value('reduce', Reduce())
+        tbl.put_value('for-each', ForEach())
+        tbl.put_value('pmap', PMap())
+
+        tbl.put_value('sleep', Sleep())
+        tbl.put_value('read-file', ReadFile())
+        tbl.put_value('socket-open', SocketOpen())
+        tbl.put_value('socket-read', SocketRead())
+        tbl.put_value('socket-write', SocketWrite())
+        tbl.put_value('socket-close', SocketClose())
+
+        for name, prim in ffi.registry.items():
+            tbl.put_value(name, prim)
+
         # basic types
         tbl.put_value("Int", BasicType.INT),
         tbl.put_value("Bool", BasicType.BOOL),
         tbl.put_value("String", BasicType.STR),
+        tbl.put_value("Float", BasicType.FLOAT),
+        tbl.put_value("Any", BasicType.ANY),
         return tbl
 
     @staticmethod
-    def init_type_table():
+    def build_type_table():
+        """
+        the types of the prelude, as seen by the type checker
+        """
         tbl = SymTable()
-        tbl.put_value('+', Add())
-        tbl.put_value('-', Sub())
-        tbl.put_value('*', Mult())
-        tbl.put_value('/', Div())
-        tbl.put_value('<', Lt())
-        tbl.put_value('<=', Lte())
-        tbl.put_value('>', Gt())
-        tbl.put_value('>=', Gte())
-        tbl.put_value('=', Eq())
-        tbl.put_value('and', And())
-        tbl.put_value('or', Or())
-        tbl.put_value('not', Not())
-
-        tbl.put_value('print', Print())
+        prelude = SymTable.prelude_value_table()
+        for name, entry in prelude.table.items():
+            val = entry.get("value")
+            if isinstance(val, PrimitiveFun):
+                tbl.put_type(name, PrimType(val))
         return tbl
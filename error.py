@@ -23,6 +23,13 @@ class ParserError(Exception):
 InterpError = ParserError
 
 
+class BudgetError(InterpError):
+    """
+    an evaluation budget (steps, time, depth or allocations) ran out
+    """
+    pass
+
+
 class LexicalError(Exception):
     def __init__(self, fname, line, col, msg):
         self.fname = fname
@@ -39,6 +46,43 @@ class LexicalError(Exception):
         return output
 
 
+class ImageError(Exception):
+    def __init__(self, fname, msg):
+        self.fname = fname
+        self.msg = msg
+
+    def __str__(self):
+        return '%s => %s' % (self.fname, self.msg)
+
+    def __repr__(self):
+        return '%s => %s' % (self.fname, self.msg)
+
+
+class FatalError(SystemExit):
+    """
+    raised by util.fatal after printing msg, exits the interpreter unless
+    an embedder catches it
+    """
+    def __init__(self, msg):
+        SystemExit.__init__(self, -1)
+        self.msg = msg
+
+
+class EmbedError(Exception):
+    """
+    a failed call or conversion between python and yin, see embed.py
+    """
+    def __init__(self, name, msg):
+        self.name = name
+        self.msg = msg
+
+    def __str__(self):
+        return '%s => %s' % (self.name, self.msg)
+
+    def __repr__(self):
+        return '%s => %s' % (self.name, self.msg)
+
+
 # class TypeCheckError(Exception):
 #     def __init__(self, msg):
 #         self.msg = msg
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+python functions as yin primitives
+
+    import math
+    from ffi import primitive
+
+    @primitive('hypot', ['Float', 'Float'], 'Float')
+    def hypot(x, y):
+        return math.hypot(x, y)
+
+    @primitive('sqrt*', ['Float'], 'Float', vectorized=True)
+    def sqrts(xs):
+        return [math.sqrt(x) for x in xs]
+
+a registered function gets its arguments unboxed to python values (the
+types are Int, Float, Bool, String, or Any for yin values passed as they
+are) and its result boxed to the declared type. A vectorized function is
+called once per call with every argument a whole vector, as a python
+list, and returns a sequence, boxed to a vector of the declared type, or
+a single value (a reduction, e.g. a dot product), so a kernel in python
+or C runs over the data without a yin call per element.
+
+the functions are in the prelude of every table created after their
+registration (SymTable.init_value_table), and the type checker checks
+calls to the scalar ones against their declared types. images and pmap
+refer to them by name, so the process that loads an image or runs a pmap
+worker must have registered them too.
+"""
+from util import fatal
+from values import (PrimitiveFun, BasicType, BoolValue, IntValue,
+                    FloatValue, StrValue, VectorValue)
+
+# name => ForeignFun
+registry = {}
+
+TYPES = {'Int': BasicType.INT, 'Float': BasicType.FLOAT,
+         'Bool': BasicType.BOOL, 'String': BasicType.STR,
+         'Any': BasicType.ANY}
+
+# type => (classes of its values, boxing)
+CONVERSIONS = {
+    BasicType.INT: ((IntValue,), IntValue),
+    BasicType.FLOAT: ((FloatValue, IntValue), lambda x: FloatValue(float(x))),
+    BasicType.BOOL: ((BoolValue,), lambda x: BoolValue(bool(x))),
+    BasicType.STR: ((StrValue,), StrValue),
+}
+
+
+def to_type(t):
+    if t in TYPES:
+        return TYPES[t]
+    if t in TYPES.values():
+        return t
+    raise ValueError('unknown type: %s' % (t,))
+
+
+class ForeignFun(PrimitiveFun):
+    """
+    a primitive calling the python function fn
+    """
+    def __init__(self, name, fn, params, result, vectorized=False):
+        super(ForeignFun, self).__init__(name, len(params), len(params))
+        self.fn = fn
+        self.params = map(to_type, params)
+        self.result = to_type(result)
+        self.vectorized = vectorized
+        self.who = 'ForeignFun(%s)' % name
+        self.unboxes = [self.unboxer(i, t) for i, t in enumerate(self.params)]
+        if self.result is BasicType.ANY:
+            self.box = None
+        else:
+            self.box = CONVERSIONS[self.result][1]
+        if not vectorized and all(t is not BasicType.ANY for t in self.params):
+            # the common case, all arguments plain values
+            self.classes = [CONVERSIONS[t][0] for t in self.params]
+            self.apply = self.apply_plain
+
+    def unboxer(self, i, t):
+        who = self.who
+        if t is BasicType.ANY:
+            if self.vectorized:
+                return lambda v: vector_values(who, i, v)
+            return lambda v: v
+        classes = CONVERSIONS[t][0]
+        msg = 'argument %d is not of type %s' % (i + 1, t)
+
+        def unbox(v):
+            if not isinstance(v, classes):
+                fatal(who, msg)
+            return v.value
+
+        def unbox_vector(v):
+            vs = vector_values(who, i, v)
+            for c in set(map(type, vs)):
+                if not issubclass(c, classes):
+                    fatal(who, 'argument %d is not a vector of %s' % (i + 1, t))
+            return [x.value for x in vs]
+
+        return unbox_vector if self.vectorized else unbox
+
+    def apply(self, args):
+        ret = self.fn(*[f(v) for f, v in zip(self.unboxes, args)])
+        if self.vectorized and hasattr(ret, '__iter__'):
+            if self.box is None:
+                return VectorValue(list(ret))
+            return VectorValue(map(self.box, ret))
+        if self.box is None:
+            return ret
+        return self.box(ret)
+
+    def compute(self, xs):
+        """
+        the result of fn on unboxed arguments of the declared types, for
+        the calls specialized by the type checker
+        """
+        return self.fn(*xs)
+
+    def apply_plain(self, args):
+        xs = []
+        for cls, v in zip(self.classes, args):
+            if not isinstance(v, cls):
+                fatal(self.who, 'argument %d is not of type %s'
+                      % (len(xs) + 1, self.params[len(xs)]))
+            xs.append(v.value)
+        ret = self.fn(*xs)
+        if self.box is None:
+            return ret
+        return self.box(ret)
+
+    def __str__(self):
+        return '<Foreign Function: %s>' % self.op
+
+
+def vector_values(who, i, v):
+    if not isinstance(v, VectorValue):
+        fatal(who, 'argument %d is not vector' % (i + 1))
+    return v.values
+
+
+def register(name, fn, params, result='Any', vectorized=False):
+    """
+    make fn the primitive name, see the module docstring
+    """
+    registry[name] = ForeignFun(name, fn, params, result, vectorized)
+    from environment import SymTable
+    SymTable.invalidate_prelude()
+    return fn
+
+
+def primitive(name, params, result='Any', vectorized=False):
+    """
+    decorator form of register
+    """
+    def decorate(fn):
+        return register(name, fn, params, result, vectorized)
+    return decorate
@@ -0,0 +1,145 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+evaluation hooks
+
+a Hooks registry holds callbacks for these events:
+
+    enter(node, tbl)                    before a node is evaluated
+    exit(node, value)                   after a node is evaluated
+    call(node, closure, args, kwargs)   a CallNode applies a closure
+    return(node, closure, value)        the closure returned
+    primitive(node, prim, args, value)  a CallNode applied a primitive
+    define(pattern, value, tbl)         a name is bound (define and params)
+    assign(pattern, value, tbl)         set! of a name, subscript or attribute
+
+every node carries its position (fname, line, col). A function that map,
+filter, reduce or for-each calls is applied at the call node of that
+primitive (values.apply_fun), so the call events see it with that node.
+
+the evaluator itself is never changed: install() generates instrumented
+versions of the interp methods (and of CallNode.apply, bind and assign)
+only for the events that have callbacks, and uninstall() puts the
+originals back. A run without hooks therefore pays nothing.
+"""
+import ast
+from ast import (Node, CallNode, NameNode, VectorNode, RecordLiteralNode,
+                 DefNode, AssignNode)
+from values import Closure, PrimitiveFun
+from util import IS
+
+EVENTS = ('enter', 'exit', 'call', 'return', 'primitive', 'define', 'assign')
+
+
+def node_classes():
+    ret = []
+    todo = [Node]
+    while todo:
+        cls = todo.pop()
+        if 'interp' in cls.__dict__:
+            ret.append(cls)
+        todo.extend(cls.__subclasses__())
+    return ret
+
+
+class Hooks(object):
+    def __init__(self):
+        self.hooks = dict((e, []) for e in EVENTS)
+        self.saved = []         # (owner, name, original)
+
+    def add(self, event, fn):
+        if event not in self.hooks:
+            raise ValueError('unknown event: %s' % event)
+        self.hooks[event].append(fn)
+        return fn
+
+    def remove(self, event, fn):
+        self.hooks[event].remove(fn)
+
+    def on(self, event):
+        """
+        decorator form of add
+        """
+        return lambda fn: self.add(event, fn)
+
+    def __nonzero__(self):
+        return any(self.hooks.values())
+
+    def patch(self, owner, name, fn):
+        if isinstance(owner, type):
+            orig = owner.__dict__[name]
+        else:
+            orig = getattr(owner, name)
+        self.saved.append((owner, name, orig))
+        setattr(owner, name, fn)
+
+    def install(self):
+        hooks = self.hooks
+        enter, exit_ = hooks['enter'], hooks['exit']
+        if enter or exit_:
+            for cls in node_classes():
+                self.patch(cls, 'interp',
+                           self.make_interp(cls.__dict__['interp'],
+                                            enter, exit_))
+
+        call, ret, prim = hooks['call'], hooks['return'], hooks['primitive']
+        if call or ret or prim:
+            orig_apply = CallNode.__dict__['apply']
+
+            def apply(node, fv, positional_args, keyword_args):
+                if IS(fv, Closure):
+                    for fn in call:
+                        fn(node, fv, positional_args, keyword_args)
+                    value = orig_apply(node, fv, positional_args, keyword_args)
+                    for fn in ret:
+                        fn(node, fv, value)
+                else:
+                    value = orig_apply(node, fv, positional_args, keyword_args)
+                    if IS(fv, PrimitiveFun):
+                        for fn in prim:
+                            fn(node, fv, positional_args, value)
+                return value
+            self.patch(CallNode, 'apply', apply)
+
+        define, assign = hooks['define'], hooks['assign']
+        if define:
+            orig_bind = ast.bind
+
+            def bind(patt, val, tbl):
+                orig_bind(patt, val, tbl)
+                if IS(patt, NameNode):
+                    for fn in define:
+                        fn(patt, val, tbl)
+            self.patch(ast, 'bind', bind)
+            # defines go through bind instead of their compiled matchers
+            self.patch(DefNode, 'match',
+                       lambda node, val, tbl: bind(node.pattern, val, tbl))
+        if assign:
+            orig_assign = ast.assign
+
+            def assign_(patt, val, tbl):
+                orig_assign(patt, val, tbl)
+                if not IS(patt, (VectorNode, RecordLiteralNode)):
+                    for fn in assign:
+                        fn(patt, val, tbl)
+            self.patch(ast, 'assign', assign_)
+            self.patch(AssignNode, 'match',
+                       lambda node, val, tbl: assign_(node.pattern, val, tbl))
+
+    @staticmethod
+    def make_interp(orig, enter, exit_):
+        def interp(node, tbl):
+            for fn in enter:
+                fn(node, tbl)
+            value = orig(node, tbl)
+            for fn in exit_:
+                fn(node, value)
+            return value
+        return interp
+
+    def uninstall(self):
+        while self.saved:
+            owner, name, orig = self.saved.pop()
+            setattr(owner, name, orig)
+
@@ -0,0 +1,109 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+heap images
+
+save() writes a global SymTable, with everything reachable from it (vectors,
+records, closures with their bodies and captured tables), to a compressed
+pickle. the prelude is not written: the prelude table and its primitives
+are saved by name and load() maps them to the prelude of the running
+process, so a restored closure still calls the same primitives.
+
+    python interpreter.py --save-image setup.img setup.yin
+    python interpreter.py --image setup.img work.yin
+"""
+import zlib
+import cPickle
+from cStringIO import StringIO
+
+from environment import SymTable
+from error import ImageError
+
+MAGIC = 'YINIMG'
+# bump when the pickled form of the nodes or values changes
+VERSION = 6
+
+
+def prelude_ids():
+    """
+    persistent id => prelude object
+    """
+    prelude = SymTable.prelude_value_table()
+    ret = {'prelude': prelude}
+    for name, entry in prelude.table.items():
+        ret['value:' + name] = entry['value']
+    return ret
+
+
+def dumps(obj, fname='<image>', compress=True):
+    """
+    obj pickled with the prelude written by name, also used to send
+    closures and values to other processes (see parallel.py)
+    """
+    ids = dict((id(v), pid) for pid, v in prelude_ids().items())
+
+    def persistent_id(v):
+        return ids.get(id(v))
+
+    buf = StringIO()
+    p = cPickle.Pickler(buf, 2)
+    p.persistent_id = persistent_id
+    try:
+        p.dump(obj)
+    except (cPickle.PicklingError, TypeError), e:
+        raise ImageError(fname, 'cannot serialize: %s' % e)
+    except RuntimeError:
+        raise ImageError(fname, 'cannot serialize: too deeply nested')
+    if compress:
+        return zlib.compress(buf.getvalue())
+    return buf.getvalue()
+
+
+def loads(data, fname='<image>', compress=True):
+    """
+    the object pickled by dumps, with the prelude of this process
+    """
+    objs = prelude_ids()
+
+    def persistent_load(pid):
+        if pid not in objs:
+            raise ImageError(fname, 'unknown primitive: %s' % pid)
+        return objs[pid]
+
+    if compress:
+        data = zlib.decompress(data)
+    u = cPickle.Unpickler(StringIO(data))
+    u.persistent_load = persistent_load
+    try:
+        return u.load()
+    except RuntimeError:
+        raise ImageError(fname, 'cannot load: too deeply nested')
+
+
+def save(tbl, path):
+    """
+    write tbl, a child of the prelude, to the image file path
+    """
+    data = dumps(tbl, path)
+    f = open(path, 'wb')
+    try:
+        f.write('%s %d\n' % (MAGIC, VERSION))
+        f.write(data)
+    finally:
+        f.close()
+
+
+def load(path):
+    """
+    the SymTable saved in the image file path
+    """
+    f = open(path, 'rb')
+    try:
+        header = f.readline()
+        data = f.read()
+    finally:
+        f.close()
+    if header != '%s %d\n' % (MAGIC, VERSION):
+        raise ImageError(path, 'not an image of this version')
+    return loads(data, path)
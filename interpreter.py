@@ -4,33 +4,165 @@
 """
 interpreter
 """
+import sys
+import time
+import threading
+
+from lexer import Lexer
 from parser import Parser
 from util import fatal
 from environment import SymTable
-from error import ParserError, InterpError
+from error import (ParserError, InterpError, BudgetError, LexicalError,
+                   ImageError)
 from constants import callstack
+from hooks import Hooks
+from type_checker import TypeChecker
+from output import Sink
+import limits
+import image
+import output
+import modules
+
+# a call of a yin function takes several python frames
+RECURSION_LIMIT = 10000
+
+_recursion_lock = threading.Lock()
+_recursion = [0, None]          # programs running, limit before the first
+
+
+def raise_recursion_limit():
+    """
+    raise the process-wide recursion limit while a program runs; the limit
+    of before is back when the last running program is done, see
+    restore_recursion_limit
+    """
+    with _recursion_lock:
+        if _recursion[0] == 0:
+            _recursion[1] = sys.getrecursionlimit()
+            if _recursion[1] < RECURSION_LIMIT:
+                sys.setrecursionlimit(RECURSION_LIMIT)
+        _recursion[0] += 1
+
+
+def restore_recursion_limit():
+    with _recursion_lock:
+        _recursion[0] -= 1
+        if _recursion[0] == 0:
+            sys.setrecursionlimit(_recursion[1])
 
 
 class Interpreter(object):
-    def __init__(self, fname, text=None):
+    def __init__(self, fname, text=None, budget=None, profiler=None,
+                 stats=None, typecheck=False, image=None, output=None,
+                 share=False, pgo=None, recorder=None):
         self.fname = fname
         self.text = text
+        self.output = output      # output.Sink, None for sys.stdout
+        self.image = image        # image file to start from, see image.py
+        self.tbl = None           # the global table, once interp() ran
+        self.typecheck = typecheck  # check and specialize before running
+        self.share = share        # hash-cons constants and names, see parser.py
+        self.pgo = pgo            # pgo.Profile to specialize with, or None
+        self.recorder = recorder  # pgo.Recorder or None
+        self.budget = budget      # limits.Budget or None
+        self.profiler = profiler  # profiler.Profiler or None
+        self.stats = stats        # stats.Stats or None
+        self.hooks = Hooks()      # evaluation hooks, see hooks.py
+
+    def parse(self):
+        stats = self.stats
+        if not stats:
+            return Parser(self.fname, self.text, share=self.share).parse()
+        start = time.time()
+        try:
+            tokens = Lexer(self.fname, self.text).tokenize()
+        except LexicalError, e:
+            fatal(str(e))
+        stats.add_phase('lex', time.time() - start)
+        start = time.time()
+        node = Parser(self.fname, tokens=tokens, share=self.share).parse()
+        stats.add_phase('parse', time.time() - start)
+        return node
 
     def interp(self):
-        p = Parser(self.fname, self.text)
         try:
-            node = p.parse()
+            node = self.parse()
+            if self.typecheck:
+                checker = TypeChecker(self.fname)
+                checker.check_program(node)
+                checker.specialize()
+            if self.pgo:
+                self.pgo.apply(node)
         except ParserError, e:
             ctx = "Traceback: \n"
-            for f in callstack:
+            for f in callstack.frames:
                 ctx = ctx + str(f) + '\n'
-            output = ctx + str(e)
-            fatal(output)
-        tbl = SymTable.init_value_table()
+            fatal(ctx + str(e))
+        if self.image:
+            try:
+                tbl = image.load(self.image)
+            except (IOError, ImageError), e:
+                fatal(str(e))
+        else:
+            tbl = SymTable.init_value_table()
+        self.tbl = tbl
+        sink = self.output
+        if sink is None:
+            sink = output.stdout()
+        saved_sink = output.install(sink)
+        saved = limits.state.active
+        saved_loading = modules.loading.stack
+        modules.loading.stack = []
+        if self.budget:
+            self.budget.start()
+            limits.state.active = self.budget
+        if self.profiler:
+            self.profiler.install()
+        if self.stats:
+            self.stats.install()
+        if self.recorder:
+            self.recorder.install()
+        if self.hooks:
+            self.hooks.install()
+        raise_recursion_limit()
+        start = time.time()
         try:
-            return node.interp(tbl)
+            return node.interp_statements(tbl)
+        except BudgetError:
+            del callstack.frames[:]
+            raise
         except InterpError, e:
             fatal(str(e))
+        except RuntimeError, e:
+            if 'recursion' not in str(e):
+                raise
+            # too deep outside of a closure call, which reports its own
+            fatal(str(InterpError(node, 'stack overflow: calls nested too deeply')))
+        finally:
+            sink.flush()
+            output.install(saved_sink)
+            limits.state.active = saved
+            modules.loading.stack = saved_loading
+            restore_recursion_limit()
+            self.hooks.uninstall()
+            if self.recorder:
+                self.recorder.uninstall()
+            if self.stats:
+                self.stats.uninstall()
+                self.stats.add_phase('eval', time.time() - start)
+            if self.profiler:
+                self.profiler.uninstall()
+
+    def interp_async(self):
+        """
+        start the program on its own thread, returns an aio.Task
+        """
+        if self.hooks or self.profiler or self.stats or self.recorder:
+            raise ValueError('hooks, the profiler, stats and pgo recording '
+                             'patch the evaluator of every thread, they '
+                             'cannot be used with interp_async')
+        from aio import spawn
+        return spawn(self)
 
     @staticmethod
     def eval(ss):
@@ -45,10 +177,79 @@ def repl():
 
 
 if __name__ == '__main__':
-    import sys
-    if len(sys.argv) == 1:
+    import argparse
+    from profiler import Profiler
+    from stats import Stats
+    from pgo import Profile, Recorder
+
+    ap = argparse.ArgumentParser(description='yin interpreter')
+    ap.add_argument('file', nargs='?', help='program to run, repl if omitted')
+    ap.add_argument('--profile', action='store_true',
+                    help='print a function profile to stderr')
+    ap.add_argument('--flamegraph', metavar='FILE',
+                    help='write collapsed call stacks to FILE (implies --profile)')
+    ap.add_argument('--stats', action='store_true',
+                    help='print runtime statistics to stderr')
+    ap.add_argument('--typecheck', action='store_true',
+                    help='type check and specialize the program before running')
+    ap.add_argument('--share', action='store_true',
+                    help='share the nodes of identical constants and names')
+    ap.add_argument('--pgo-record', metavar='FILE',
+                    help='write a profile of the run to FILE')
+    ap.add_argument('--pgo', metavar='FILE',
+                    help='specialize the program with the profile in FILE')
+    ap.add_argument('--load', metavar='FILE', action='append', default=[],
+                    help='run the python file FILE first, e.g. to register '
+                    'primitives with ffi.py')
+    ap.add_argument('--image', metavar='FILE',
+                    help='start from the global table saved in FILE')
+    ap.add_argument('--save-image', metavar='FILE',
+                    help='save the global table to FILE after the run')
+    ap.add_argument('--flush', choices=output.POLICIES,
+                    help='when output is written: after each line, when the '
+                    'buffer is full, or at the end (default: line on a '
+                    'terminal, size otherwise)')
+    opts = ap.parse_args()
+
+    for path in opts.load:
+        import imp
+        import os.path
+        name = os.path.splitext(os.path.basename(path))[0]
+        imp.load_source(name, path)
+
+    if opts.file is None:
         import readline
         repl()
     else:
-        i = Interpreter(sys.argv[1])
-        i.interp()
+        profiler = None
+        if opts.profile or opts.flamegraph:
+            profiler = Profiler()
+        stats = Stats() if opts.stats else None
+        recorder = Recorder() if opts.pgo_record else None
+        pgo = None
+        if opts.pgo:
+            try:
+                pgo = Profile.load(opts.pgo)
+            except (IOError, ValueError), e:
+                fatal(str(e))
+        i = Interpreter(opts.file, profiler=profiler, stats=stats,
+                        typecheck=opts.typecheck, image=opts.image,
+                        output=Sink(sys.stdout, opts.flush),
+                        share=opts.share, pgo=pgo, recorder=recorder)
+        try:
+            i.interp()
+            if opts.save_image:
+                try:
+                    image.save(i.tbl, opts.save_image)
+                except (IOError, ImageError), e:
+                    fatal(str(e))
+        finally:
+            if recorder:
+                recorder.profile().save(opts.pgo_record)
+            if stats:
+                print >> sys.stderr, stats.report()
+            if profiler:
+                print >> sys.stderr, profiler.report()
+                if opts.flamegraph:
+                    with open(opts.flamegraph, 'w') as fp:
+                        fp.write(profiler.collapsed())
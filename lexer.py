@@ -26,6 +26,8 @@ def is_name_char(char):
 
 
 class Token(object):
+    __slots__ = ('ty', 'lexeme', 'fname', 'start', 'end', 'line', 'col')
+
     def __init__(self, ty, lexeme, fname, start, end, line, col):
         self.ty = ty            # Token type, Number, String, Name etc
         self.lexeme = lexeme
@@ -42,24 +44,32 @@ class Token(object):
 
 
 class DelimeterToken(Token):
+    __slots__ = ()
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(DelimeterToken, self).__init__("Delimeter", lexeme,
                                              fname, start, end, line, col)
 
 
 class NumToken(Token):
+    __slots__ = ()
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(NumToken, self).__init__("Number", lexeme,
                                        fname, start, end, line, col)
 
 
 class StrToken(Token):
+    __slots__ = ()
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(StrToken, self).__init__("String", lexeme,
                                        fname, start, end, line, col)
 
 
 class NameToken(Token):
+    __slots__ = ()
+
     def __init__(self, lexeme, fname, start, end, line, col):
         super(NameToken, self).__init__("Name", lexeme,
                                         fname, start, end, line, col)
@@ -199,6 +209,30 @@ class Lexer(object):
             raise LexicalError(self.fname, self.line, self.col,
                                "unkown token: %s" % self.peek)
 
+    def tokenize(self):
+        ret = []
+        tok = self.next_token()
+        while tok:
+            ret.append(tok)
+            tok = self.next_token()
+        return ret
+
+
+class TokenList(object):
+    """
+    replays tokens scanned earlier through the interface of Lexer
+    """
+    def __init__(self, tokens):
+        self.tokens = tokens
+        self.pos = 0
+
+    def next_token(self):
+        if self.pos >= len(self.tokens):
+            return False
+        tok = self.tokens[self.pos]
+        self.pos += 1
+        return tok
+
 
 if __name__ == '__main__':
     import sys
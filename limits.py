@@ -0,0 +1,75 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+evaluation budgets
+
+a Budget bounds one run of the interpreter by the number of evaluation
+steps (function applications), a wall-clock deadline, the call depth and an
+approximate number of allocated values (call frames, vectors and records,
+also the vectors built by primitives such as range and map).
+Running out raises BudgetError, an InterpError the embedder can catch.
+
+one budget is active per thread at a time (`state.active`), so a program
+run by interp_async is only charged for its own steps; when it is None the
+evaluator pays a single check per call.
+"""
+import threading
+import time
+
+from error import BudgetError
+from constants import callstack
+
+
+class State(threading.local):
+    active = None
+
+state = State()
+
+
+# how many steps between two looks at the clock
+CLOCK_INTERVAL = 256
+
+
+class Budget(object):
+    def __init__(self, max_steps=None, timeout=None, max_depth=None,
+                 max_values=None):
+        self.max_steps = max_steps
+        self.timeout = timeout
+        self.max_depth = max_depth
+        self.max_values = max_values
+        self.start()
+
+    def start(self):
+        self.steps = 0
+        self.values = 0
+        if self.timeout is not None:
+            self.deadline = time.time() + self.timeout
+        else:
+            self.deadline = None
+
+    def step(self, node):
+        """
+        account for one function application at node
+        """
+        self.steps += 1
+        self.values += 1
+        if self.max_steps is not None and self.steps > self.max_steps:
+            raise BudgetError(node, "evaluation step budget (%s) exceeded"
+                              % self.max_steps)
+        if self.max_depth is not None and\
+           len(callstack.frames) >= self.max_depth:
+            raise BudgetError(node, "maximum call depth (%s) exceeded"
+                              % self.max_depth)
+        if self.max_values is not None and self.values > self.max_values:
+            raise BudgetError(node, "allocation budget (%s values) exceeded"
+                              % self.max_values)
+        if self.deadline is not None and\
+           self.steps % CLOCK_INTERVAL == 0 and time.time() > self.deadline:
+            raise BudgetError(node, "deadline of %ss exceeded" % self.timeout)
+
+    def alloc(self, node, n):
+        self.values += n
+        if self.max_values is not None and self.values > self.max_values:
+            raise BudgetError(node, "allocation budget (%s values) exceeded"
+                              % self.max_values)
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+modules
+
+(import name) looks for name.yin in the directory of the importing file,
+then in the directories of $YIN_PATH, then in the current directory. the
+module is loaded on first use of one of its names: it is evaluated in a
+global table of its own and its top-level names are its exports. each
+module is evaluated once per process (again if its source changes, and
+for each job of the server, see worker.py), and its parsed form is cached
+on disk in __yincache__ next to the source.
+"""
+import os
+import cPickle
+import threading
+
+from parser import Parser
+from environment import SymTable
+from values import ModuleValue, Exports
+from error import InterpError
+
+EXT = '.yin'
+CACHE_DIR = '__yincache__'
+# bump when the pickled form of the nodes changes
+CACHE_VERSION = 5
+
+_loaded = {}        # path => (mtime, size, exports)
+
+
+class Loading(threading.local):
+    """
+    (path, name) of the modules being evaluated by the program of this
+    thread: the programs started by interp_async import on threads of
+    their own. Interpreter.interp gives each run a new stack
+    """
+    def __init__(self):
+        self.stack = []
+
+loading = Loading()
+
+
+def reset():
+    """
+    forget the loaded modules, the next import evaluates them again
+    """
+    _loaded.clear()
+
+
+def search_path(fname):
+    dirs = [os.path.dirname(os.path.abspath(fname))]
+    dirs.extend([d for d in os.environ.get('YIN_PATH', '').split(os.pathsep)
+                 if d])
+    dirs.append(os.getcwd())
+    return dirs
+
+
+def resolve(name, fname):
+    """
+    the path of module name imported from the file fname, or None
+    """
+    for d in search_path(fname):
+        path = os.path.join(d, name + EXT)
+        if os.path.isfile(path):
+            return os.path.abspath(path)
+    return None
+
+
+def find(node):
+    """
+    the module of an ImportNode, not loaded yet
+    """
+    path = resolve(node.name, node.fname)
+    if path is None:
+        raise InterpError(node, "no module named %s" % node.name)
+    return ModuleValue(node.name, path, node, load)
+
+
+def load(module):
+    """
+    the exports of a module, evaluated unless it already is: a view of its
+    global table, not a copy
+    """
+    path = module.path
+    st = os.stat(path)
+    entry = _loaded.get(path)
+    if entry and entry[0] == st.st_mtime and entry[1] == st.st_size:
+        return entry[2]
+
+    stack = loading.stack
+    paths = [p for p, _ in stack]
+    if path in paths:
+        raise InterpError(module.node, "circular import: %s"
+                          % ' -> '.join(cycle(module, paths.index(path))))
+
+    stack.append((path, module.name))
+    try:
+        node = parse(path, st)
+        tbl = SymTable.init_value_table()
+        node.interp_statements(tbl)
+    finally:
+        stack.pop()
+
+    exports = Exports(tbl.table)
+    _loaded[path] = (st.st_mtime, st.st_size, exports)
+    return exports
+
+
+def cycle(module, start):
+    """
+    the names of the modules of an import cycle, from the first one being
+    loaded to module; the module whose code made the import may be done
+    loading (a function of it called by a module being loaded)
+    """
+    stack = loading.stack
+    names = [n for _, n in stack[start:]]
+    importer = os.path.abspath(module.node.fname)
+    if importer != stack[-1][0]:
+        names.append(os.path.splitext(os.path.basename(importer))[0])
+    names.append(module.name)
+    return names
+
+
+def cache_path(path):
+    d, base = os.path.split(path)
+    return os.path.join(d, CACHE_DIR, base + '.ast')
+
+
+def parse(path, st):
+    """
+    the parsed module, from the disk cache when it is up to date
+    """
+    cache = cache_path(path)
+    try:
+        f = open(cache, 'rb')
+        try:
+            version, mtime, size, node = cPickle.load(f)
+        finally:
+            f.close()
+        if (version, mtime, size) == (CACHE_VERSION, st.st_mtime, st.st_size):
+            return node
+    except Exception:       # missing, stale or unreadable: parse again
+        pass
+
+    node = Parser(path).parse()
+    tmp = '%s.%d' % (cache, os.getpid())
+    try:
+        if not os.path.isdir(os.path.dirname(cache)):
+            os.mkdir(os.path.dirname(cache))
+        f = open(tmp, 'wb')
+        try:
+            cPickle.dump((CACHE_VERSION, st.st_mtime, st.st_size, node), f, 2)
+        finally:
+            f.close()
+        os.rename(tmp, cache)
+    except (IOError, OSError, cPickle.PicklingError, RuntimeError):
+        pass
+    return node
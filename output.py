@@ -0,0 +1,160 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+output sinks
+
+print writes to the sink of the running interpreter instead of going
+through a print statement per call. A Sink collects the text in a buffer
+and hands it to its target according to its flush policy:
+
+    'line'  after every write (the default when the target is a terminal)
+    'size'  when the buffer holds `size` characters or more (the default)
+    'end'   only when flush() is called, the interpreter does at the end
+
+the target is a file-like object (anything with write()), a callable that
+gets each flushed block of text, or None to keep the text in memory for
+getvalue().
+
+the sink is per thread, like the programs started by interp_async; with
+no sink installed print goes to sys.stdout directly. an interpreter given
+no sink uses the one of stdout(), kept for the thread. fatal() flushes the
+sink of its thread before printing the error, and the sinks still holding
+text are flushed when the process exits.
+"""
+import atexit
+import os
+import sys
+import threading
+import weakref
+
+BUFFER_SIZE = 1 << 16
+
+POLICIES = ('line', 'size', 'end')
+
+class _Local(threading.local):
+    sink = None
+    stdout = None
+
+_local = _Local()
+
+# every sink, for flush_all
+_sinks = weakref.WeakSet()
+
+
+class Sink(object):
+    def __init__(self, target=None, flush=None, size=BUFFER_SIZE):
+        if flush is None:
+            isatty = getattr(target, 'isatty', None)
+            flush = 'line' if isatty and isatty() else 'size'
+        if flush not in POLICIES:
+            raise ValueError('unknown flush policy: %s' % flush)
+        self.target = target
+        self.policy = flush
+        self.size = size
+        self.parts = []
+        self.pending = 0
+        self.chunks = [] if target is None else None   # flushed, in memory
+        self.stream = None
+        _sinks.add(self)
+        if target is None or callable(target):
+            self.emit = target
+        else:
+            self.emit = target.write
+        # print calls write once per line, bind the policy up front
+        if flush == 'line':
+            self.write = self.write_line
+        elif flush == 'end':
+            self.write = self.parts.append
+        elif isinstance(target, file):
+            # a real file buffers in C: give a copy of its descriptor a
+            # buffer of our size instead of joining strings here
+            target.flush()
+            self.stream = os.fdopen(os.dup(target.fileno()), 'w', size)
+            self.write = self.stream.write
+
+    def write(self, text):
+        self.parts.append(text)
+        self.pending += len(text)
+        if self.pending >= self.size:
+            self.flush()
+
+    def write_line(self, text):
+        self.parts.append(text)
+        self.flush()
+
+    def flush(self):
+        if self.stream is not None:
+            self.stream.flush()
+            return
+        if self.parts:
+            text = ''.join(self.parts)
+            del self.parts[:]
+            self.pending = 0
+            if self.emit is None:
+                self.chunks.append(text)
+            else:
+                self.emit(text)
+        if self.emit is not None and self.emit is not self.target:
+            flush = getattr(self.target, 'flush', None)
+            if flush:
+                flush()
+
+    def getvalue(self):
+        """
+        everything written so far, for an in-memory sink
+        """
+        self.flush()
+        if self.chunks is None:
+            raise ValueError('the output of this sink is not kept')
+        return ''.join(self.chunks)
+
+
+def stdout():
+    """
+    the sink of sys.stdout for this thread, shared by the interpreters given
+    no sink of their own: a new sink on a file dups its descriptor
+    """
+    sink = _local.stdout
+    if sink is None or sink.target is not sys.stdout:
+        sink = _local.stdout = Sink(sys.stdout)
+    return sink
+
+
+def current():
+    return _local.sink
+
+
+def install(sink):
+    """
+    make sink the output of this thread, returns the previous one
+    """
+    prev = _local.sink
+    _local.sink = sink
+    return prev
+
+
+def flush():
+    """
+    flush the sink of this thread, if any
+    """
+    sink = _local.sink
+    if sink is not None:
+        sink.flush()
+
+
+@atexit.register
+def flush_all():
+    for sink in list(_sinks):
+        try:
+            sink.flush()
+        except (IOError, OSError, ValueError):
+            pass
+
+
+def write(text):
+    sink = _local.sink
+    if sink is None:
+        sys.stdout.write(text)
+    else:
+        sink.write(text)
@@ -0,0 +1,135 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+parallel map
+
+(pmap f vec [chunk] [workers]) applies f to the elements of vec in a pool
+of worker processes and returns the results in order. f and the chunks of
+vec are serialized like images (image.dumps): the closure goes with the
+entries of its tables that its body names (trim), not with every global,
+and the results come back as copies, so f should not rely on side
+effects. The closure is handed to the pool when it starts and loaded once
+per worker; the chunks carry only the values. The pool is kept for the
+next pmap of the same closure.
+
+in a daemonic process (e.g. a worker of server.py), which may not start
+processes of its own, pmap runs serially.
+"""
+import hashlib
+import multiprocessing
+
+from ast import walk, NameNode
+from util import fatal, IS
+from values import apply_fun, Closure
+from environment import SymTable
+from constants import callstack
+from error import ParserError, ImageError
+import image
+import limits
+import output
+
+_pool = None
+_key = None                     # (workers, digest of the closure) of _pool
+
+_closure = [None, None]         # (serialized, loaded) closure of this worker
+
+
+def init_worker(fdata):
+    # the forked worker starts with the state of the pmap caller
+    del callstack.frames[:]
+    callstack.callback_depth = 0
+    limits.state.active = None
+    output.install(None)
+    _closure[:] = [fdata, None]
+
+
+def get_pool(workers, digest, fdata):
+    global _pool, _key
+    if _pool is None or _key != (workers, digest):
+        if _pool is not None:
+            _pool.terminate()
+        _pool = multiprocessing.Pool(workers, init_worker, (fdata,))
+        _key = (workers, digest)
+    return _pool
+
+
+def trim(f, memo=None):
+    """
+    a copy of the closure f whose tables keep only the names used in its
+    body, closures among their values trimmed the same way
+    """
+    if memo is None:
+        memo = {}
+    if id(f) in memo:
+        return memo[id(f)]
+    ret = memo[id(f)] = Closure(f.args, f.properties, f.body, None, f.guards)
+    names = set([n.id for n in walk(f.body) if IS(n, NameNode)])
+    prelude = SymTable.prelude_value_table()
+    layers = []
+    tbl = f.tbl
+    while tbl is not None and tbl is not prelude:
+        layers.append(tbl)
+        tbl = tbl.parent
+    for layer in reversed(layers):
+        tbl = SymTable(tbl)
+        for name in names.intersection(layer.table):
+            entry = layer.table[name]
+            if IS(entry.get('value'), Closure):
+                entry = dict(entry, value=trim(entry['value'], memo))
+            tbl.table[name] = entry
+    ret.tbl = tbl
+    return ret
+
+
+def run_chunk(chunk):
+    """
+    in a worker: apply the closure of the pool to a chunk, returns
+    (serialized results, None) or (None, error message)
+    """
+    try:
+        if _closure[1] is None:
+            _closure[1] = image.loads(_closure[0], '<pmap>', False)
+        f = _closure[1]
+        xs = image.loads(chunk, '<pmap>', False)
+        ys = [apply_fun('PMap.apply', f, [x]) for x in xs]
+        return image.dumps(ys, '<pmap>', False), None
+    except (ParserError, ImageError), e:
+        return None, str(e)
+    except SystemExit:
+        return None, 'the function failed in a worker'
+    finally:
+        # a failed call leaves its frames, the worker runs more chunks
+        del callstack.frames[:]
+        callstack.callback_depth = 0
+
+
+def pmap(f, values, chunk=None, workers=None):
+    """
+    the list of f applied to each of values
+    """
+    if workers is None:
+        workers = multiprocessing.cpu_count()
+    if chunk is None:
+        chunk = max(1, -(-len(values) // (4 * workers)))
+    if multiprocessing.current_process().daemon or not values:
+        return [apply_fun('PMap.apply', f, [x]) for x in values]
+
+    if IS(f, Closure):
+        f = trim(f)
+    try:
+        fdata = image.dumps(f, '<pmap>', False)
+        jobs = [image.dumps(values[i:i + chunk], '<pmap>', False)
+                for i in xrange(0, len(values), chunk)]
+    except ImageError, e:
+        fatal('PMap.apply', str(e))
+    pool = get_pool(workers, hashlib.md5(fdata).hexdigest(), fdata)
+    ret = []
+    for data, error in pool.map(run_chunk, jobs):
+        if error is not None:
+            fatal('PMap.apply', error)
+        try:
+            ret.extend(image.loads(data, '<pmap>', False))
+        except ImageError, e:
+            fatal('PMap.apply', str(e))
+    return ret
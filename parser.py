@@ -4,17 +4,33 @@
 """
 parser
 """
-from lexer import (Lexer, Token, DelimeterToken,
+from lexer import (Lexer, TokenList, Token, DelimeterToken,
                    NumToken, StrToken, NameToken)
 from constants import *
 from ast import *
 from util import *
 from error import ParserError, LexicalError
+import scope
 
 
 class Parser(object):
-    def __init__(self, fname, text=None):
-        self.lex = Lexer(fname, text)
+    def __init__(self, fname, text=None, tokens=None, share=False):
+        if tokens is not None:
+            self.lex = TokenList(tokens)
+        else:
+            self.lex = Lexer(fname, text)
+        # hash-consing: share_key => the one node for identical constants,
+        # names and literals made of them (errors in a shared node are
+        # reported at its first occurrence)
+        self.shared = {} if share else None
+
+    def share(self, node):
+        if self.shared is None:
+            return node
+        key = share_key(node)
+        if key is None:
+            return node
+        return self.shared.setdefault(key, node)
 
     def parse_pair(self, p):
         open_delim = p.open_delim
@@ -62,6 +78,15 @@ class Parser(object):
                         patt.check_dup()
                     val = self.parse_tok_or_pair(p.elements[2])
                     return DefNode(patt, val, fname, start, end, line, col)
+                elif kw == IMPORT_KW:
+                    if len(p.elements) != 2 or\
+                       not isinstance(p.elements[1], NameToken):
+                        raise ParserError(open_delim, 'import: expect a module name')
+                    tok = p.elements[1]
+                    name = tok.lexeme
+                    patt = NameNode(name.split('/')[-1], tok.fname, tok.start,
+                                    tok.end, tok.line, tok.col)
+                    return ImportNode(name, patt, fname, start, end, line, col)
                 elif kw == IF_KW:
                     if len(p.elements) != 4:
                         if len(p.elements) == 3:
@@ -102,16 +127,20 @@ class Parser(object):
         # vector literal
         elif IS(p, SquarePair):
             eles = self.parse_lst(p.elements)
-            return VectorNode(eles, fname, start, end, line, col)
+            return self.share(VectorNode(eles, fname, start, end, line, col))
         # record literal
         elif IS(p, CurlyPair):
             elements = self.parse_lst(p.elements)
             kv_map = dict(Parser.parse_map(elements))
-            return RecordLiteralNode(kv_map, fname, start, end, line, col)
+            return self.share(RecordLiteralNode(kv_map, fname, start, end,
+                                                line, col))
         else:
             raise ParserError(open_delim, 'unkown pair')
 
     def parse_tok(self, tok):
+        return self.share(self.parse_leaf(tok))
+
+    def parse_leaf(self, tok):
         lexeme = tok.lexeme
         fname = tok.fname
         start = tok.start
@@ -168,8 +197,9 @@ class Parser(object):
             statements.append(self.parse_tok_or_pair(pt))
             pt = self.next_pair_or_tok(0)
         last = statements[len(statements)-1]
-        return BlockNode(statements, first.fname, first.start, last.end,
+        node = BlockNode(statements, first.fname, first.start, last.end,
                          first.line, first.col)
+        return scope.analyze(node)
 
     def parse_properties(self, lst):
         params = []
@@ -267,6 +297,9 @@ class Pair(object):
     '''
     content between (), [], {}
     '''
+    __slots__ = ('elements', 'open_delim', 'close_delim',
+                 'fname', 'start', 'end', 'line', 'col')
+
     def __init__(self, first, last, elements):
         self.elements = elements
         self.open_delim = first
@@ -324,16 +357,22 @@ class Pair(object):
 
 
 class ParenPair(Pair):
+    __slots__ = ()
+
     def __init__(self, first, last, elements):
         super(ParenPair, self).__init__(first, last, elements)
 
 
 class SquarePair(Pair):
+    __slots__ = ()
+
     def __init__(self, first, last, elements):
         super(SquarePair, self).__init__(first, last, elements)
 
 
 class CurlyPair(Pair):
+    __slots__ = ()
+
     def __init__(self, first, last, elements):
         super(CurlyPair, self).__init__(first, last, elements)
 
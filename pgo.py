@@ -0,0 +1,269 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+profile-guided specialization
+
+a run with a Recorder installed counts, per call site, the closures it
+called and the operand types of the primitives it applied, and per if the
+branches taken; save() writes them as a JSON profile keyed by source
+position (file:line:col):
+
+    python interpreter.py --pgo-record job.prof job.yin
+    python interpreter.py --pgo job.prof job.yin
+
+a later run with the profile rewrites the tree before evaluating it:
+
+  * a call site that only ever applied one arithmetic or comparison
+    primitive to one combination of Int and Float operands becomes a
+    GuardedPrimCallNode, which checks the operand types and computes
+    directly
+  * a hot call site that only ever called one small closure (no inner
+    functions or defines, at most INLINE_NODES nodes) becomes an
+    InlineCallNode, which binds the arguments and evaluates the body
+    statements in one table, without the argument node, keyword matching,
+    bind() or the table of the body block
+
+both check that the site still sees what the profile saw, and deoptimize
+otherwise: the node goes back to a plain CallNode for good. The rewritten
+calls do not go through CallNode.apply, so the call and primitive hooks
+do not see them.
+
+branch counts are kept in the profile for reading only: the branches of
+an if are two subtrees, and evaluating one or the other costs the same
+whatever their order.
+"""
+import json
+
+from ast import walk, CallNode, IfNode, TypedIfNode, FunNode, NameNode
+from values import (Closure, BoolValue, IntValue, FloatValue,
+                    Add, Sub, Mult, Div, Lt, Lte, Gt, Gte, Eq)
+from environment import SymTable
+from error import InterpError
+from constants import callstack
+from hooks import Hooks
+from scope import declared
+from util import IS
+import limits
+
+VERSION = 1
+
+# calls a site must have seen to be rewritten
+MIN_CALLS = 32
+
+# largest closure body inlined, in nodes
+INLINE_NODES = 40
+
+ARITH = (Add, Sub, Mult, Div)
+COMPARE = (Lt, Lte, Gt, Gte, Eq)
+
+NUMBERS = {'IntValue': IntValue, 'FloatValue': FloatValue}
+
+
+def site(node):
+    return '%s:%d:%d' % (node.fname, node.line, node.col)
+
+
+class Recorder(object):
+    """
+    collects a profile while installed
+    """
+    def __init__(self):
+        self.calls = {}         # CallNode => {body BlockNode => count}
+        self.prims = {}         # CallNode => {(op, value class names) => count}
+        self.branches = {}      # IfNode => [then, else]
+        self.hooks = Hooks()
+        self.hooks.add('call', self.on_call)
+        self.hooks.add('primitive', self.on_primitive)
+        self.saved = []
+
+    def on_call(self, node, closure, args, kwargs):
+        callees = self.calls.get(node)
+        if callees is None:
+            callees = self.calls[node] = {}
+        callees[closure.body] = callees.get(closure.body, 0) + 1
+
+    def on_primitive(self, node, prim, args, value):
+        sigs = self.prims.get(node)
+        if sigs is None:
+            sigs = self.prims[node] = {}
+        sig = (prim.op, tuple([v.__class__.__name__ for v in args]))
+        sigs[sig] = sigs.get(sig, 0) + 1
+
+    def install(self):
+        branches = self.branches
+
+        def interp(node, tbl):
+            test = node.test.interp(tbl)
+            if not IS(test, BoolValue):
+                raise InterpError(node.test, 'Test is not a boolean value')
+            counts = branches.get(node)
+            if counts is None:
+                counts = branches[node] = [0, 0]
+            if test.value:
+                counts[0] += 1
+                return node.conseq.interp(tbl)
+            else:
+                counts[1] += 1
+                return node.alt.interp(tbl)
+
+        for cls in (IfNode, TypedIfNode):
+            self.saved.append((cls, cls.__dict__['interp']))
+            cls.interp = interp
+        self.hooks.install()
+
+    def uninstall(self):
+        self.hooks.uninstall()
+        for cls, orig in self.saved:
+            cls.interp = orig
+        self.saved = []
+
+    def profile(self):
+        calls = {}
+        for node, callees in self.calls.items():
+            calls[site(node)] = dict((site(body), n)
+                                     for body, n in callees.items())
+        prims = {}
+        for node, sigs in self.prims.items():
+            prims[site(node)] = [[op, list(types), n]
+                                 for (op, types), n in sigs.items()]
+        branches = dict((site(node), counts)
+                        for node, counts in self.branches.items())
+        return Profile(calls, prims, branches)
+
+
+class Profile(object):
+    def __init__(self, calls=None, prims=None, branches=None):
+        self.calls = calls or {}        # site => {callee body site => count}
+        self.prims = prims or {}        # site => [[op, [class names], count]]
+        self.branches = branches or {}  # site => [then, else]
+
+    def save(self, path):
+        with open(path, 'w') as fp:
+            json.dump({'version': VERSION, 'calls': self.calls,
+                       'primitives': self.prims,
+                       'branches': self.branches}, fp, indent=1,
+                      sort_keys=True)
+
+    @staticmethod
+    def load(path):
+        with open(path) as fp:
+            d = json.load(fp)
+        if d.get('version') != VERSION:
+            raise ValueError('%s: not a profile of this version' % path)
+        return Profile(d['calls'], d['primitives'], d['branches'])
+
+    def apply(self, root):
+        """
+        rewrite the hot call sites of the tree root, returns the number of
+        nodes changed
+        """
+        bodies = {}
+        for n in walk(root):
+            if IS(n, FunNode):
+                bodies[site(n.body)] = n
+        changed = 0
+        for n in walk(root):
+            if type(n) is not CallNode or n.args.keywords:
+                continue
+            key = site(n)
+            if key in self.prims and specialize_prim(n, self.prims[key]):
+                changed += 1
+            elif key in self.calls and inline_call(n, self.calls[key], bodies):
+                changed += 1
+        return changed
+
+
+def specialize_prim(node, sigs):
+    if len(sigs) != 1:
+        return False
+    op, types, count = sigs[0]
+    if count < MIN_CALLS or len(types) < 2:
+        return False
+    if not all(t in NUMBERS for t in types):
+        return False
+    prim = SymTable.prelude_value_table().lookup_value(op)
+    if IS(prim, COMPARE):
+        result = BoolValue
+    elif IS(prim, ARITH):
+        result = FloatValue if 'FloatValue' in types else IntValue
+    else:
+        return False
+    node.__class__ = GuardedPrimCallNode
+    node.prim = prim
+    node.result = result
+    node.guard = tuple([NUMBERS[t] for t in types])
+    return True
+
+
+def inline_call(node, callees, bodies):
+    if len(callees) != 1:
+        return False
+    body_site, count = callees.items()[0]
+    fun = bodies.get(body_site)
+    if fun is None or count < MIN_CALLS:
+        return False
+    if len(node.args.positional) != len(fun.args):
+        return False
+    if not all(IS(a, NameNode) for a in fun.args):
+        return False
+    nodes = list(walk(fun.body))
+    if len(nodes) > INLINE_NODES:
+        return False
+    # the body shares the table of the parameters: nothing may be defined
+    # in it, and no closure may count the tables above it
+    if declared(fun.body) or any(IS(n, FunNode) for n in nodes):
+        return False
+    node.__class__ = InlineCallNode
+    node.prim = fun.body
+    return True
+
+
+class GuardedPrimCallNode(CallNode):
+    """
+    call of the primitive self.prim on operands of the classes self.guard,
+    as seen in the profile; self.result is the class of the result
+    """
+    __slots__ = ()
+
+    def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.step(self)
+        fv = self.fun.interp(tbl)
+        if fv is self.prim:
+            args = [arg.interp(tbl) for arg in self.args.positional]
+            for v, cls in zip(args, self.guard):
+                if v.__class__ is not cls:
+                    break
+            else:
+                return self.result(fv.compute([v.value for v in args]))
+            self.__class__ = CallNode
+            return self.apply(fv, args, {})
+        self.__class__ = CallNode
+        positional_args, keyword_args = self.args.interp(tbl)
+        return self.apply(fv, positional_args, keyword_args)
+
+
+class InlineCallNode(CallNode):
+    """
+    call of the closures of the FunNode whose body is self.prim
+    """
+    __slots__ = ()
+
+    def interp(self, tbl):
+        if limits.state.active:
+            limits.state.active.step(self)
+        fv = self.fun.interp(tbl)
+        if IS(fv, Closure) and fv.body is self.prim and not fv.guards:
+            frame = SymTable(fv.tbl)
+            for param, arg in zip(fv.args, self.args.positional):
+                frame.put_value(param.id, arg.interp(tbl))
+            frames = callstack.frames
+            frames.append(self)
+            try:
+                return self.prim.interp_statements(frame)
+            finally:
+                frames.pop()
+        self.__class__ = CallNode
+        positional_args, keyword_args = self.args.interp(tbl)
+        return self.apply(fv, positional_args, keyword_args)
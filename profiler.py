@@ -0,0 +1,170 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+function-level profiler
+
+while installed, every application made by a CallNode is timed. Closures
+are keyed by the source location of their `fun` form, primitives by their
+name. The profiler records call counts, inclusive and exclusive time per
+function, totals per call site, and exclusive time per call stack, which
+is written in the collapsed format read by flamegraph.pl and speedscope.
+
+closures called by map, filter, reduce and for-each are timed at the
+call of the primitive, see values.apply_fun. The calls the type checker
+and pgo.py specialize are evaluated as plain calls while profiling, so
+they are all counted (and timed without their specialization).
+
+overhead: the profiler replaces CallNode.apply only while it is installed,
+so an unprofiled run is not slowed down at all. A profiled run pays two
+clock reads and some bookkeeping per call, about 1.5x the run time of
+fib in benchmarks/profile_overhead.py.
+"""
+import time
+
+from ast import CallNode, NameNode
+from values import Closure, PrimitiveFun
+from environment import SymTable
+
+clock = time.time
+
+
+def primitive_names():
+    return SymTable.prelude_value_table().table
+
+
+def specialized_calls():
+    """
+    the subclasses of CallNode with an interp of their own
+    """
+    ret = []
+    todo = list(CallNode.__subclasses__())
+    while todo:
+        cls = todo.pop()
+        if 'interp' in cls.__dict__:
+            ret.append(cls)
+        todo.extend(cls.__subclasses__())
+    return ret
+
+
+class FunStats(object):
+    def __init__(self, name):
+        self.name = name
+        self.calls = 0
+        self.inclusive = 0.0
+        self.exclusive = 0.0
+
+
+class Profiler(object):
+    def __init__(self):
+        self.funs = {}          # function key => FunStats
+        self.sites = {}         # call site location => [calls, time]
+        self.stacks = {}        # tuple of function names => exclusive time
+        self.stack = []         # [path, children time] of active calls
+        self.active = {}        # function key or call site => recursion depth
+        self.orig_apply = None
+        self.saved = []         # (class, original interp)
+
+    @staticmethod
+    def location(node):
+        return '%s:%s:%s' % (node.fname, node.line, node.col)
+
+    def fun_key(self, node, fv):
+        if isinstance(fv, Closure):
+            key = self.location(fv.body)
+            if key not in self.funs:
+                if isinstance(node.fun, NameNode) and\
+                   node.fun.id not in primitive_names():
+                    name = node.fun.id
+                else:
+                    # an anonymous closure, or one called back by a
+                    # primitive at the call node of the primitive
+                    name = 'fun'
+                self.funs[key] = FunStats('%s@%s' % (name, key))
+        elif isinstance(fv, PrimitiveFun):
+            key = fv.op
+            if key not in self.funs:
+                self.funs[key] = FunStats('<%s>' % fv.op)
+        else:
+            key = None
+        return key
+
+    def install(self):
+        orig = self.orig_apply = CallNode.__dict__['apply']
+        prof = self
+        # the calls specialized by the type checker and pgo.py are
+        # evaluated as plain calls, through apply, while profiling
+        for cls in specialized_calls():
+            self.saved.append((cls, cls.__dict__['interp']))
+            cls.interp = CallNode.__dict__['interp']
+
+        def apply(node, fv, positional_args, keyword_args):
+            key = prof.fun_key(node, fv)
+            if key is None:
+                return orig(node, fv, positional_args, keyword_args)
+            stats = prof.funs[key]
+            stack = prof.stack
+            path = (stack[-1][0] if stack else ()) + (stats.name,)
+            frame = [path, 0.0]
+            stack.append(frame)
+            loc = prof.location(node)
+            depth = prof.active.get(key, 0)
+            prof.active[key] = depth + 1
+            site_depth = prof.active.get(loc, 0)
+            prof.active[loc] = site_depth + 1
+            start = clock()
+            try:
+                return orig(node, fv, positional_args, keyword_args)
+            finally:
+                elapsed = clock() - start
+                stack.pop()
+                prof.active[key] = depth
+                prof.active[loc] = site_depth
+                if stack:
+                    stack[-1][1] += elapsed
+                own = elapsed - frame[1]
+                stats.calls += 1
+                stats.exclusive += own
+                if depth == 0:      # don't count recursive calls twice
+                    stats.inclusive += elapsed
+                site = prof.sites.setdefault(loc, [0, 0.0])
+                site[0] += 1
+                if site_depth == 0:
+                    site[1] += elapsed
+                prof.stacks[path] = prof.stacks.get(path, 0.0) + own
+
+        CallNode.apply = apply
+
+    def uninstall(self):
+        if self.orig_apply:
+            CallNode.apply = self.orig_apply
+            self.orig_apply = None
+        for cls, orig in self.saved:
+            cls.interp = orig
+        self.saved = []
+
+    def report(self, limit=30):
+        lines = ['%8s %12s %12s %12s  %s' % ('calls', 'incl(ms)', 'excl(ms)',
+                                            'us/call', 'function')]
+        funs = sorted(self.funs.values(), key=lambda f: -f.exclusive)
+        for f in funs[:limit]:
+            per_call = f.exclusive / f.calls * 1e6 if f.calls else 0
+            lines.append('%8d %12.3f %12.3f %12.2f  %s' %
+                         (f.calls, f.inclusive * 1e3, f.exclusive * 1e3,
+                          per_call, f.name))
+        lines.append('')
+        lines.append('%8s %12s  %s' % ('calls', 'total(ms)', 'call site'))
+        sites = sorted(self.sites.items(), key=lambda s: -s[1][1])
+        for loc, (calls, total) in sites[:limit]:
+            lines.append('%8d %12.3f  %s' % (calls, total * 1e3, loc))
+        return '\n'.join(lines)
+
+    def collapsed(self):
+        """
+        one line per stack: frames separated by ';' and the exclusive time
+        in microseconds
+        """
+        lines = []
+        for path, t in sorted(self.stacks.items()):
+            lines.append('%s %d' % (';'.join(path), int(t * 1e6)))
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+free variable analysis
+
+finds, for every FunNode, the variables of the enclosing functions and
+blocks that it uses (its free variables, including the ones its inner
+functions use) and how many tables up from the table the closure is
+created in each of them lives. FunNode.interp then captures just those:
+the table of the closure is one flat layer of their entries on top of the
+global layer, instead of the whole chain of tables it was created in.
+
+entries are shared, not copied, so an entry works as a cell: set! on a
+captured variable is seen by the closure and by its defining scope alike.
+a variable that is not defined yet when the closure is created (a later
+define in an enclosing block) gets an empty entry that the define fills.
+
+names not defined in an enclosing function or block (globals, primitives)
+are looked up dynamically in the global layer, as before.
+
+the table layers mirror the evaluator: a block is one table, a call is a
+table of parameters under the table of the body block, and a closure with
+free variables adds its flat layer.
+"""
+from ast import (walk, Node, NameNode, AttrNode, DefNode, ImportNode,
+                 BlockNode, FunNode)
+from util import IS
+
+
+def declared(block):
+    """
+    names defined in the table of a block: defines and imports that are not
+    inside a nested block or function body
+    """
+    ret = set()
+    todo = list(block.statements)
+    while todo:
+        n = todo.pop()
+        if IS(n, (DefNode, ImportNode)):
+            ret.update([p.id for p in walk(n.pattern) if IS(p, NameNode)])
+            if IS(n, DefNode):
+                todo.append(n.value)
+        elif IS(n, BlockNode):
+            continue
+        elif IS(n, FunNode):
+            todo.extend(property_nodes(n))
+        else:
+            todo.extend(n.children())
+    return ret
+
+
+def property_nodes(fun):
+    """
+    the parameter properties of fun, evaluated where fun is
+    """
+    ret = []
+    if fun.properties:
+        for entry in fun.properties.table.values():
+            ret.extend([v for v in entry.values() if IS(v, Node)])
+    return ret
+
+
+class Layer(object):
+    def __init__(self, names, owner, is_global=False):
+        self.names = names          # names defined in the table
+        self.owner = owner          # innermost FunNode around it, or None
+        self.is_global = is_global
+
+
+class Analyzer(object):
+    def __init__(self):
+        self.parent = {}        # FunNode => enclosing FunNode or None
+        self.free = {}          # FunNode => set of free names
+        self.blocks = {}        # id(BlockNode) => declared names
+
+    def analyze(self, root):
+        """
+        annotate the FunNodes of a program, root is evaluated in the
+        global table
+        """
+        top = Layer(declared(root), None, True)
+        for s in root.statements:
+            self.resolve(s, [top], None)
+        for s in root.statements:
+            self.layout(s, [None])
+
+    def resolve(self, node, layers, fun):
+        if IS(node, NameNode):
+            self.reference(node.id, layers, fun)
+        elif IS(node, AttrNode):
+            self.resolve(node.value, layers, fun)
+        elif IS(node, DefNode):
+            self.resolve(node.value, layers, fun)
+        elif IS(node, ImportNode):
+            pass
+        elif IS(node, BlockNode):
+            names = self.blocks[id(node)] = declared(node)
+            layers = layers + [Layer(names, fun)]
+            for s in node.statements:
+                self.resolve(s, layers, fun)
+        elif IS(node, FunNode):
+            for p in property_nodes(node):
+                self.resolve(p, layers, fun)
+            self.parent[node] = fun
+            self.free[node] = set()
+            params = Layer(set([a.id for a in node.args]), node)
+            self.resolve(node.body, layers + [params], node)
+        else:
+            for c in node.children():
+                self.resolve(c, layers, fun)
+
+    def reference(self, name, layers, fun):
+        for layer in reversed(layers):
+            if name in layer.names:
+                if layer.is_global:
+                    return
+                # free in every function between the use and the definition
+                f = fun
+                while f is not layer.owner:
+                    self.free[f].add(name)
+                    f = self.parent[f]
+                return
+
+    def layout(self, node, tables):
+        """
+        tables: the names of the tables the node is evaluated in, innermost
+        last, None for the global one
+        """
+        if IS(node, BlockNode):
+            tables = tables + [self.blocks[id(node)]]
+            for s in node.statements:
+                self.layout(s, tables)
+        elif IS(node, FunNode):
+            for p in property_nodes(node):
+                self.layout(p, tables)
+            free = sorted(self.free[node])
+            inner = list(reversed(tables))
+            node.depth = inner.index(None)
+            node.free = []
+            for name in free:
+                for hops, names in enumerate(inner):
+                    if names is not None and name in names:
+                        node.free.append((name, hops))
+                        break
+            body = [None]
+            if free:
+                body.append(set(free))
+            body.append(set([a.id for a in node.args]))
+            self.layout(node.body, body)
+        else:
+            for c in node.children():
+                self.layout(c, tables)
+
+
+def analyze(root):
+    Analyzer().analyze(root)
+    return root
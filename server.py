@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+interpreter server
+
+keeps a pool of warm worker processes and evaluates yin programs sent over
+a unix socket (or stdin/stdout). The protocol is one JSON object per line:
+
+    request:  {"path": "a.yin"}  or  {"text": "(print 1)", "name": "stdin"}
+              optionally with "budget": {"max_steps": 100000, "timeout": 1.0,
+                                         "max_depth": 100, "max_values": 1e6}
+    response: {"name": ..., "output": ..., "error": null, "time": 0.001}
+
+workers are recycled after --max-jobs jobs.
+"""
+import os
+import sys
+import json
+import argparse
+import multiprocessing
+import SocketServer
+
+from worker import warm_up, run_job
+
+DEFAULT_SOCKET = '/tmp/yin.sock'
+
+
+class Server(object):
+    def __init__(self, workers=None, max_jobs=1000):
+        self.pool = multiprocessing.Pool(workers, initializer=warm_up,
+                                         maxtasksperchild=max_jobs)
+
+    def handle(self, line):
+        try:
+            req = json.loads(line)
+            if 'text' in req:
+                args = (req.get('name', 'stdin'), req['text'])
+            else:
+                args = (req['path'], None)
+            args += (None, req.get('budget'))
+        except (ValueError, KeyError, TypeError), e:
+            return {'name': None, 'output': '', 'time': 0,
+                    'error': 'bad request: %s' % e}
+        return self.pool.apply(run_job, args)
+
+    def serve_stream(self, rfile, wfile):
+        for line in iter(rfile.readline, ''):
+            if not line.strip():
+                continue
+            wfile.write(json.dumps(self.handle(line)) + '\n')
+            wfile.flush()
+
+    def serve_unix(self, path):
+        if os.path.exists(path):
+            os.unlink(path)
+        server = self
+
+        class Handler(SocketServer.StreamRequestHandler):
+            def handle(self):
+                server.serve_stream(self.rfile, self.wfile)
+
+        sock = SocketServer.ThreadingUnixStreamServer(path, Handler)
+        sock.daemon_threads = True
+        try:
+            sock.serve_forever()
+        finally:
+            sock.server_close()
+            os.unlink(path)
+
+    def close(self):
+        self.pool.terminate()
+        self.pool.join()
+
+
+def main():
+    ap = argparse.ArgumentParser(description='yin interpreter server')
+    ap.add_argument('--socket', default=DEFAULT_SOCKET,
+                    help='unix socket path (default: %(default)s)')
+    ap.add_argument('--stdio', action='store_true',
+                    help='serve requests on stdin/stdout instead of a socket')
+    ap.add_argument('--workers', type=int, default=None,
+                    help='number of worker processes (default: cpu count)')
+    ap.add_argument('--max-jobs', type=int, default=1000,
+                    help='recycle a worker after this many jobs')
+    opts = ap.parse_args()
+
+    server = Server(opts.workers, opts.max_jobs)
+    try:
+        if opts.stdio:
+            server.serve_stream(sys.stdin, sys.stdout)
+        else:
+            server.serve_unix(opts.socket)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+runtime statistics
+
+aggregate counters for one run: nodes evaluated by type, closures created,
+symbol table frames allocated, environment chain depth of lookups, values
+allocated by class, maximum call depth, and the time of the lex, parse and
+eval phases. Like the hooks they are collected only while installed.
+"""
+from hooks import Hooks
+from environment import SymTable
+from values import Value, Closure
+from constants import callstack
+
+
+class Stats(object):
+    def __init__(self):
+        self.nodes = {}         # node class name => evaluations
+        self.values = {}        # value class name => allocations
+        self.closures = 0
+        self.frames = 0
+        self.lookups = 0
+        self.lookup_depth = 0   # sum of chain depths
+        self.max_lookup_depth = 0
+        self.max_call_depth = 0
+        self.phases = {}        # phase => seconds
+
+        self.hooks = Hooks()
+        self.hooks.add('enter', self.on_enter)
+        self.hooks.add('call', self.on_call)
+        self.saved = []
+
+    def on_enter(self, node, tbl):
+        name = node.__class__.__name__
+        self.nodes[name] = self.nodes.get(name, 0) + 1
+
+    def on_call(self, node, closure, args, kwargs):
+        depth = len(callstack.frames) + 1
+        if depth > self.max_call_depth:
+            self.max_call_depth = depth
+
+    def install(self):
+        stats = self
+
+        def new_frame(cls, *args, **kwargs):
+            stats.frames += 1
+            return object.__new__(cls)
+
+        def new_value(cls, *args, **kwargs):
+            name = cls.__name__
+            stats.values[name] = stats.values.get(name, 0) + 1
+            if issubclass(cls, Closure):
+                stats.closures += 1
+            return object.__new__(cls)
+
+        def lookup_property(tbl, name, key):
+            depth = 0
+            val = None
+            while tbl:
+                val = tbl.lookup_property_local(name, key)
+                if val:
+                    break
+                tbl = tbl.parent
+                depth += 1
+            stats.lookups += 1
+            stats.lookup_depth += depth
+            if depth > stats.max_lookup_depth:
+                stats.max_lookup_depth = depth
+            return val
+
+        self.saved = [(SymTable, 'lookup_property',
+                       SymTable.__dict__['lookup_property'])]
+        SymTable.lookup_property = lookup_property
+        SymTable.__new__ = staticmethod(new_frame)
+        Value.__new__ = staticmethod(new_value)
+        self.hooks.install()
+
+    def uninstall(self):
+        self.hooks.uninstall()
+        for owner, name, orig in self.saved:
+            setattr(owner, name, orig)
+        self.saved = []
+        for cls in (SymTable, Value):
+            if '__new__' in cls.__dict__:
+                del cls.__new__
+
+    def add_phase(self, phase, seconds):
+        self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def as_dict(self):
+        if self.lookups:
+            avg_depth = float(self.lookup_depth) / self.lookups
+        else:
+            avg_depth = 0.0
+        return {'nodes': dict(self.nodes),
+                'closures': self.closures,
+                'frames': self.frames,
+                'lookups': self.lookups,
+                'avg_lookup_depth': avg_depth,
+                'max_lookup_depth': self.max_lookup_depth,
+                'values': dict(self.values),
+                'max_call_depth': self.max_call_depth,
+                'phases': dict(self.phases)}
+
+    def report(self):
+        d = self.as_dict()
+        lines = ['phases:']
+        for phase in ('lex', 'parse', 'eval'):
+            if phase in d['phases']:
+                lines.append('  %-28s %10.3f ms' % (phase, d['phases'][phase] * 1e3))
+        lines.append('nodes evaluated:')
+        for name, n in sorted(d['nodes'].items(), key=lambda x: -x[1]):
+            lines.append('  %-28s %10d' % (name, n))
+        lines.append('values allocated:')
+        for name, n in sorted(d['values'].items(), key=lambda x: -x[1]):
+            lines.append('  %-28s %10d' % (name, n))
+        lines.append('%-30s %10d' % ('closures created:', d['closures']))
+        lines.append('%-30s %10d' % ('frames allocated:', d['frames']))
+        lines.append('%-30s %10d' % ('lookups:', d['lookups']))
+        lines.append('%-30s %10.2f' % ('average lookup depth:',
+                                      d['avg_lookup_depth']))
+        lines.append('%-30s %10d' % ('max lookup depth:',
+                                     d['max_lookup_depth']))
+        lines.append('%-30s %10d' % ('max call depth:', d['max_call_depth']))
+        return '\n'.join(lines)
@@ -0,0 +1,25 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+foreign functions used by tests/ffi.yin:
+
+    python interpreter.py --load tests/ffi_prims.py tests/ffi.yin
+"""
+import math
+
+from ffi import primitive, register
+
+
+@primitive('hypot', ['Float', 'Float'], 'Float')
+def hypot(x, y):
+    return math.hypot(x, y)
+
+
+@primitive('dot', ['Int', 'Int'], 'Int', vectorized=True)
+def dot(xs, ys):
+    return sum(x * y for x, y in zip(xs, ys))
+
+
+register('upper', lambda s: s.upper(), ['String'], 'String')
+register('vlen', lambda v: len(v.values), ['Any'], 'Int')
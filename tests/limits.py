@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+evaluation budgets (limits.py), each limit on a program that exceeds it
+and on one that does not:
+
+    python tests/limits.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from limits import Budget
+from error import BudgetError
+from output import Sink
+
+LOOP = """
+(define loop (fun (n) (if (= n 0) 0 (loop (- n 1)))))
+(loop %d)
+"""
+
+MAP_LOOP = """
+(define down (fun (n) (if (= n 0) [] (map down [(- n 1)]))))
+(down %d)
+"""
+
+RANGE = "(length (range %d))"
+
+MAP = "(length (map (fun (x) x) [1 2 3 4 5 6 7 8 9 %d]))"
+
+WORK = "(length (map (fun (x) (* x x)) (range %d)))"
+
+SPIN = "(map (fun (i) (map (fun (j) j) (range 1000))) (range 1000))"
+
+
+def run(name, text, **budget):
+    sink = Sink()
+    try:
+        Interpreter(name, text, Budget(**budget), output=sink).interp()
+        print '%-10s ok' % name
+    except BudgetError, e:
+        print '%-10s %s' % (name, e)
+
+
+def main():
+    run('steps', LOOP % 10, max_steps=100)
+    run('steps', LOOP % 1000, max_steps=100)
+    run('depth', LOOP % 10, max_depth=50)
+    run('depth', LOOP % 100, max_depth=50)
+    run('map', MAP_LOOP % 10, max_depth=50)
+    run('map', MAP_LOOP % 100, max_depth=50)
+    run('range', RANGE % 100, max_values=1000)
+    run('range', RANGE % 5000, max_values=1000)
+    run('map', MAP % 10, max_values=50)
+    run('map', MAP % 10, max_values=20)
+    run('timeout', SPIN, timeout=0.2)
+
+    # a budget only bounds the program it was given: an unbudgeted program
+    # on another thread is neither charged nor stopped
+    limited = Interpreter('limited', SPIN, Budget(max_steps=20000),
+                          output=Sink()).interp_async()
+    free = Interpreter('free', WORK % 300000, output=Sink()).interp_async()
+    try:
+        limited.result(10)
+    except BudgetError, e:
+        print 'async     ', e
+    print 'async      free => %s' % free.result(10)
+    print 'async      limited => %s' % limited.exception().__class__.__name__
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+pmap in worker processes (parallel.py), including functions that fail:
+
+    python tests/pmap.py 2>/dev/null
+
+the workers print the errors of yin to their stderr as they happen.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from error import FatalError
+from output import Sink
+
+PROGRAMS = [
+    ('square', '(print (pmap (fun (x) (* x x)) (range 8) 2 2))'),
+    # every chunk goes to the one worker, which keeps running after the
+    # item that fails
+    ('fails', '(pmap (fun (x) (if (= x 3) (+ x "a") x)) (range 8) 1 1)'),
+    ('after', '(print (pmap (fun (x) (+ x 1)) (range 8) 1 1))'),
+    ('strings', '(define s (reduce string-append "" (map (fun (i) "ab") '
+                '(range 20000))))\n'
+                '(print (pmap string-length [s "abc"] 1 2))'),
+]
+
+
+def main():
+    for name, text in PROGRAMS:
+        sink = Sink()
+        try:
+            Interpreter(name, text, output=sink).interp()
+            print '%-10s %s' % (name, sink.getvalue().strip())
+        except FatalError, e:
+            print '%-10s %s' % (name, e.msg)
+
+
+if __name__ == '__main__':
+    main()
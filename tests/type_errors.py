@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+the errors the type checker reports, with their positions, and whether
+check_incremental agrees with the full check on them and on tests/*.yin:
+
+    python tests/type_errors.py
+"""
+import glob
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                                os.pardir))
+
+from interpreter import Interpreter
+from type_checker import TypeChecker
+from error import TypeCheckError
+from util import read_file
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+
+PROGRAMS = [
+    ('if', '(if 1 2 3)'),
+    ('annotation', '(define f (fun ((n Int)) n))\n(f "x")'),
+    ('unknown', '(define f (fun ((n Long)) n))'),
+    ('arity', '(define g (fun (x) x))\n(g 1 2)'),
+    ('arith', '(+ 1 "a")'),
+    ('logic', '(and 1 true)'),
+    ('call', '(1 2)'),
+    ('nested', '(define h (fun ((s String))\n  (string-append s (* s 2))))'),
+    ('ok', '(define k (fun ((n Int)) (+ n 1)))\n(k 41)'),
+    ('local set!', '(define f (fun (x) (seq (define b 1) (set! b true) '
+                   '(if b x 0))))'),
+]
+
+
+def full(name, text):
+    """
+    the error of check_program, or None
+    """
+    try:
+        TypeChecker(name).check_program(Interpreter(name, text).parse())
+    except TypeCheckError, e:
+        return str(e)
+    return None
+
+
+def incremental(name, text):
+    try:
+        TypeChecker(name, processes=1).check_incremental(text)
+    except TypeCheckError, e:
+        return str(e)
+    return None
+
+
+def main():
+    for name, text in PROGRAMS:
+        node = Interpreter(name, text).parse()
+        try:
+            print '%-10s %s' % (name, TypeChecker(name).check_program(node))
+        except TypeCheckError, e:
+            print '%-10s %s' % (name, e)
+
+    programs = list(PROGRAMS)
+    for path in sorted(glob.glob(os.path.join(TESTS, '*.yin'))):
+        programs.append((path, read_file(path)))
+    for name, text in programs:
+        a, b = full(name, text), incremental(name, text)
+        if a == b:
+            print 'same       %s' % os.path.basename(name)
+        else:
+            print 'DIFFERENT  %s: full %s, incremental %s' % (
+                os.path.basename(name), a, b)
+
+
+if __name__ == '__main__':
+    main()
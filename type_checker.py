@@ -3,30 +3,518 @@
 
 """
 type checker
+
+infers a type for every expression of a program, reports the errors it can
+prove before the program runs, and records what it proved so that
+specialize() can rewrite the tree for faster evaluation:
+
+  * an `if` whose test is known to be Bool becomes a TypedIfNode
+  * a call of a primitive on arguments known to be numbers (or booleans)
+    becomes a PrimCallNode, which skips the checks of PrimitiveFun.apply
+  * a `fun` with annotated parameters, e.g. (fun ((n Int)) ...), becomes
+    a TypedFunNode; its closures check the annotations on every call, so
+    the body can rely on them
+
+the inference is conservative: names that are ever the target of set! and
+names not known yet (e.g. used before their define) have type Any.
+
+check_incremental() checks the top-level statements of a program one by
+one, in dependency order, and caches the types each one defines. after an
+edit only the statements whose source or dependency types changed are
+checked again; statements that do not depend on each other are checked in
+a process pool.
 """
+import hashlib
+import multiprocessing
+import re
+
 from parser import Parser
-from util import fatal
+from util import fatal, IS
 from environment import SymTable
-from error import ParserError, TypeCheckError
-from constants import callstack
+from error import ParserError, LexicalError, TypeCheckError
+from constants import callstack, COMMENT_PREFIX, is_open, is_close
+from ast import *
+from ffi import ForeignFun
+
+INT = BasicType.INT
+FLOAT = BasicType.FLOAT
+BOOL = BasicType.BOOL
+STR = BasicType.STR
+ANY = BasicType.ANY
+
+NUMBER = (INT, FLOAT)
+
+# annotation name => type
+ANNOTATIONS = {'Int': INT, 'Float': FLOAT, 'Bool': BOOL, 'String': STR,
+               'Any': ANY}
+
+# type => class of its runtime values
+VALUE_CLASSES = {INT: IntValue, FLOAT: FloatValue, BOOL: BoolValue,
+                 STR: StrValue}
+
+ARITH = (Add, Sub, Mult, Div)
+COMPARE = (Lt, Lte, Gt, Gte)
+LOGIC = (And, Or, Not)
+
+# result types of the other primitives
+PRIM_RESULTS = {StrAppend: STR, Substring: STR, StrLength: INT,
+                StrJoin: STR, ReadFile: STR, Sleep: BOOL,
+                SocketWrite: INT, SocketRead: STR, Length: INT}
+
+
+# smallest batch of statements worth sending to the pool
+PARALLEL_MIN = 256
+
+
+def join(t1, t2):
+    if t1 is t2:
+        return t1
+    return ANY
+
+
+def names_of(node):
+    """
+    names in node, e.g. the names bound by a pattern
+    """
+    return [n.id for n in walk(node) if IS(n, NameNode)]
+
+
+# tokens as far as nesting is concerned: comments, strings, delimiters and
+# everything else
+TOKEN_REGEX = re.compile(r'--[^\n]*|"[^"\n]*"|[()\[\]{}]|[^\s()\[\]{}"]+|"')
+
+
+def split_statements(text):
+    """
+    find the top-level statements of text without parsing it, returns a
+    list of (start, end, line, col), or None if the delimiters do not match
+    """
+    ret = []
+    depth = 0
+    start = None
+    line = 1
+    last = 0
+    for m in TOKEN_REGEX.finditer(text):
+        tok = m.group()
+        if tok.startswith(COMMENT_PREFIX):
+            continue
+        if depth == 0:
+            start = m.start()
+            line += text.count('\n', last, start)
+            last = start
+            col = start - text.rfind('\n', 0, start) - 1
+        if is_open(tok):
+            depth += 1
+        elif is_close(tok):
+            depth -= 1
+            if depth < 0:
+                return None
+        if depth == 0:
+            ret.append((start, m.end(), line, col))
+    if depth != 0:
+        return None
+    return ret
+
+
+def parse_statement(fname, text, start, end, line, col):
+    """
+    parse text[start:end], with the positions of the whole text
+    """
+    node = Parser(fname, text[start:end]).parse()
+    seen = set()
+    for n in walk(node):
+        if id(n) in seen:
+            continue
+        seen.add(id(n))
+        if n.line == 1:
+            n.col += col
+        n.line += line - 1
+        n.start += start
+        n.end += start
+    return node.statements
+
+
+def check_statements(job):
+    """
+    check the statements of one top-level unit, job is (statements, types
+    of the top-level names they use, assigned names they use). returns
+    (types of the names they define, None) or (None, (node, msg))
+    """
+    statements, env, mutated = job
+    checker = TypeChecker(statements[0].fname)
+    checker.mutated = mutated
+    tenv = SymTable(SymTable.init_type_table())
+    for name, ty in env.iteritems():
+        tenv.put_type(name, ty)
+    types = {}
+    try:
+        for stmt in statements:
+            checker.check(stmt, tenv)
+            if IS(stmt, (DefNode, ImportNode)):
+                for name in names_of(stmt.pattern):
+                    types[name] = tenv.lookup_type_local(name)
+    except ParserError, e:
+        return None, (e.node, e.msg)
+    return types, None
 
 
 class TypeChecker(object):
-    def __init__(self, fname):
+    def __init__(self, fname=None, processes=None):
         self.fname = fname
+        self.mutated = set()    # names assigned with set!
+        self.bool_tests = []    # IfNodes with a Bool test
+        self.prim_calls = []    # (CallNode, primitive, result value class)
+        self.fun_guards = []    # (FunNode, guards)
+        # used by check_incremental
+        self.processes = processes
+        self.pool = None
+        self.summaries = {}     # statement source hash => names
+        self.cache = {}         # statement key => types it defines
+        self.checked = 0        # statements checked by the last run
 
     def type_check(self):
         p = Parser(self.fname)
         try:
             node = p.parse()
+            return self.check_program(node)
         except ParserError, e:
             ctx = "Traceback: \n"
-            for f in callstack:
+            for f in callstack.frames:
                 ctx = ctx + str(f) + '\n'
             output = ctx + str(e)
             fatal(output)
-        tbl = SymTable.init_type_table()
-        try:
-            return node.interp(tbl)
-        except TypeCheckError, e:
-            fatal(str(e))
+
+    def check_program(self, node, tenv=None):
+        if tenv is None:
+            tenv = SymTable.init_type_table()
+        for n in walk(node):
+            if IS(n, AssignNode):
+                for p in walk(n.pattern):
+                    if IS(p, NameNode):
+                        self.mutated.add(p.id)
+        return self.check(node, tenv)
+
+    def check(self, node, tenv):
+        method = getattr(self, 'check_' + node.__class__.__name__, None)
+        if method is None:
+            for child in node.children():
+                self.check(child, tenv)
+            return ANY
+        return method(node, tenv)
+
+    def check_IntNode(self, node, tenv):
+        return INT
+
+    def check_FloatNode(self, node, tenv):
+        return FLOAT
+
+    def check_StrNode(self, node, tenv):
+        return STR
+
+    def check_BoolNode(self, node, tenv):
+        return BOOL
+
+    def check_NameNode(self, node, tenv):
+        if node.id in self.mutated:
+            return ANY
+        return tenv.lookup_type(node.id) or ANY
+
+    def check_IfNode(self, node, tenv):
+        test = self.check(node.test, tenv)
+        if test is BOOL:
+            self.bool_tests.append(node)
+        elif test is not ANY:
+            raise TypeCheckError(node.test, 'Test is not a boolean value')
+        conseq = self.check(node.conseq, tenv)
+        alt = self.check(node.alt, tenv)
+        return join(conseq, alt)
+
+    def check_DefNode(self, node, tenv):
+        ty = self.check(node.value, tenv)
+        if IS(node.pattern, NameNode):
+            self.declare(node.pattern.id, ty, tenv)
+        else:
+            for p in walk(node.pattern):
+                if IS(p, NameNode):
+                    self.declare(p.id, ANY, tenv)
+        return ANY
+
+    def check_ImportNode(self, node, tenv):
+        self.declare(node.pattern.id, ANY, tenv)
+        return ANY
+
+    def check_AssignNode(self, node, tenv):
+        self.check(node.value, tenv)
+        if not IS(node.pattern, NameNode):
+            self.check(node.pattern, tenv)
+        return ANY
+
+    def declare(self, name, ty, tenv):
+        if name in self.mutated:
+            ty = ANY
+        tenv.put_type(name, ty)
+
+    def check_BlockNode(self, node, tenv):
+        tenv = SymTable(tenv)
+        # names defined in this block shadow the outer ones from the start
+        for s in node.statements:
+            if IS(s, (DefNode, ImportNode)):
+                for p in walk(s.pattern):
+                    if IS(p, NameNode):
+                        self.declare(p.id, ANY, tenv)
+        ty = ANY
+        for s in node.statements:
+            ty = self.check(s, tenv)
+        return ty
+
+    def check_FunNode(self, node, tenv):
+        tenv = SymTable(tenv)
+        params = []
+        guards = {}
+        for arg in node.args:
+            ty = ANY
+            if node.properties:
+                ann = node.properties.lookup_type_local(arg.id)
+                if ann is not None:
+                    ty = self.annotation(ann)
+            if ty in VALUE_CLASSES:
+                guards[arg.id] = (VALUE_CLASSES[ty], str(ty))
+            self.declare(arg.id, ty, tenv)
+            params.append(ty)
+        if guards:
+            self.fun_guards.append((node, guards))
+        ret = self.check(node.body, tenv)
+        return FunType(params, ret)
+
+    def annotation(self, ann):
+        if not IS(ann, NameNode):
+            raise TypeCheckError(ann, 'a type must be a name')
+        if ann.id not in ANNOTATIONS:
+            raise TypeCheckError(ann, 'unknown type: %s' % ann.id)
+        return ANNOTATIONS[ann.id]
+
+    def check_CallNode(self, node, tenv):
+        fty = self.check(node.fun, tenv)
+        args = node.args
+        arg_types = [self.check(a, tenv) for a in args.positional]
+        for v in args.keywords.values():
+            self.check(v, tenv)
+
+        if IS(fty, PrimType):
+            return self.check_primitive(node, fty.prim, arg_types)
+        elif IS(fty, FunType):
+            if len(args.positional) + len(args.keywords) != len(fty.params):
+                raise TypeCheckError(args, "wrong number of actual arguments")
+            for a, ty, param in zip(args.positional, arg_types, fty.params):
+                if ty is not ANY and param is not ANY and ty is not param:
+                    raise TypeCheckError(a, "argument is not of type %s" % param)
+            return fty.ret
+        elif fty is not ANY:
+            raise TypeCheckError(node, "unkown type function")
+        return ANY
+
+    def check_primitive(self, node, prim, arg_types):
+        n = len(arg_types)
+        if not prim.check_arity(n) or node.args.keywords:
+            return ANY
+        known = ANY not in arg_types
+        if IS(prim, ARITH) and n < 2 and not IS(prim, Sub):
+            return ANY
+        if IS(prim, ARITH) or IS(prim, COMPARE):
+            for a, ty in zip(node.args.positional, arg_types):
+                if ty is not ANY and ty not in NUMBER:
+                    raise TypeCheckError(a, 'argument for %s must be integer or float'
+                                         % prim.op)
+            if IS(prim, COMPARE):
+                result = BOOL
+            elif FLOAT in arg_types:
+                result = FLOAT
+            elif known:
+                result = INT
+            else:
+                return ANY
+            if known and n >= 2:
+                self.prim_calls.append((node, prim, VALUE_CLASSES[result]))
+            return result
+        elif IS(prim, Eq):
+            if known and n >= 2 and all(ty in NUMBER for ty in arg_types):
+                self.prim_calls.append((node, prim, BoolValue))
+            return BOOL
+        elif IS(prim, LOGIC):
+            for a, ty in zip(node.args.positional, arg_types):
+                if ty is not ANY and ty is not BOOL:
+                    raise TypeCheckError(a, 'argument for %s must be boolean'
+                                         % prim.op)
+            if known:
+                self.prim_calls.append((node, prim, BoolValue))
+            return BOOL
+        elif IS(prim, ForeignFun):
+            if prim.vectorized:
+                return ANY
+            # a specialized call unboxes every argument, so all the params
+            # must be declared with a scalar type and get exactly it
+            exact = True
+            for a, ty, param in zip(node.args.positional, arg_types, prim.params):
+                if ty is ANY or param is ANY or ty is param:
+                    exact = exact and ty is param and param is not ANY
+                elif not (param is FLOAT and ty is INT):
+                    raise TypeCheckError(a, 'argument for %s must be %s'
+                                         % (prim.op, param))
+                else:
+                    exact = False
+            if exact and prim.box is not None:
+                self.prim_calls.append((node, prim, prim.box))
+            return prim.result
+        return PRIM_RESULTS.get(prim.__class__, ANY)
+
+    def check_incremental(self, text):
+        """
+        check the program in text, returns a dict of the types of its
+        top-level names, or raises the error of the first statement that
+        has one. unchanged statements are not parsed again, and the ones
+        whose dependency types did not change either are not checked
+        again, so the results are for reporting only: specialize() knows
+        nothing about them
+        """
+        spans = split_statements(text)
+        if spans is None:
+            Parser(self.fname, text).parse()    # raises the syntax error
+
+        # what each statement defines, uses and assigns, by source
+        units = []
+        summaries = {}
+        parsed = {}
+        for i, (start, end, line, col) in enumerate(spans):
+            src = text[start:end]
+            if IS(src, unicode):
+                src = src.encode('utf-8')
+            digest = hashlib.md5(src).hexdigest()
+            summary = self.summaries.get(digest)
+            if summary is None:
+                try:
+                    stmts = parse_statement(self.fname, text, start, end,
+                                            line, col)
+                except (LexicalError, ParserError):
+                    Parser(self.fname, text).parse()
+                    raise
+                parsed[i] = stmts
+                defined = []
+                assigned = set()
+                for s in stmts:
+                    if IS(s, (DefNode, ImportNode)):
+                        defined.extend(names_of(s.pattern))
+                    for n in walk(s):
+                        if IS(n, AssignNode):
+                            assigned.update(names_of(n.pattern))
+                refs = set()
+                for s in stmts:
+                    refs.update(names_of(s))
+                summary = (defined, refs, assigned)
+            summaries[digest] = summary
+            units.append((digest, summary))
+        self.summaries = summaries
+
+        self.mutated = set()
+        top = set()
+        for _, (defined, _, assigned) in units:
+            top.update(defined)
+            self.mutated.update(assigned)
+
+        # the unit that defines each name, and the dependency levels: a
+        # unit only depends on units of lower levels
+        definer = {}
+        deps = []
+        levels = []
+        for i, (_, (defined, refs, _)) in enumerate(units):
+            refs = refs & top
+            ds = set(definer[r] for r in refs if r in definer)
+            deps.append(refs)
+            levels.append(1 + max([levels[j] for j in ds] or [-1]))
+            for name in defined:
+                definer[name] = i
+
+        by_level = {}
+        for i, level in enumerate(levels):
+            by_level.setdefault(level, []).append(i)
+
+        # names are Any until their define has been checked, as in check()
+        results = {}
+        errors = {}
+        cache = {}
+        self.checked = 0
+        for level in sorted(by_level):
+            todo = []
+            for i in by_level[level]:
+                env = {}
+                for r in deps[i]:
+                    j = definer.get(r)
+                    if j is not None and j < i and r in results.get(j, ()):
+                        env[r] = results[j][r]
+                    else:
+                        env[r] = ANY
+                # as in check_program: every name of the statement, local
+                # ones too, that is assigned anywhere
+                mutated = units[i][1][1] & self.mutated
+                key = (units[i][0],
+                       tuple(sorted((r, str(ty)) for r, ty in env.iteritems())),
+                       tuple(sorted(mutated)))
+                if key in self.cache:
+                    results[i] = cache[key] = self.cache[key]
+                    continue
+                stmts = parsed.get(i)
+                if stmts is None:
+                    stmts = parse_statement(self.fname, text, *spans[i])
+                todo.append((i, key, (stmts, env, mutated)))
+
+            jobs = [job for _, _, job in todo]
+            if len(jobs) >= PARALLEL_MIN and self.processes != 1:
+                if self.pool is None:
+                    self.pool = multiprocessing.Pool(self.processes)
+                n = self.processes or multiprocessing.cpu_count()
+                checked = self.pool.map(check_statements, jobs,
+                                        max(1, len(jobs) / (4 * n)))
+            else:
+                checked = map(check_statements, jobs)
+            self.checked += len(jobs)
+
+            for (i, key, _), (result, error) in zip(todo, checked):
+                if error is not None:
+                    errors[i] = error
+                else:
+                    results[i] = cache[key] = result
+
+        # forget the statements that are gone
+        self.cache = cache
+        if errors:
+            node, msg = errors[min(errors)]
+            raise TypeCheckError(node, msg)
+        types = {}
+        for i in sorted(results):
+            types.update(results[i])
+        return types
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def specialize(self):
+        """
+        rewrite the checked tree in place, returns the number of nodes changed
+        """
+        for node in self.bool_tests:
+            node.__class__ = TypedIfNode
+        for node, prim, result in self.prim_calls:
+            node.__class__ = PrimCallNode
+            node.prim = prim
+            node.result = result
+        for node, guards in self.fun_guards:
+            node.__class__ = TypedFunNode
+            node.guards = guards
+        return len(self.bool_tests) + len(self.prim_calls) + len(self.fun_guards)
+
+
+if __name__ == '__main__':
+    import sys
+    print TypeChecker(sys.argv[1]).type_check()
@@ -7,6 +7,9 @@ util functions
 import sys
 import os.path
 
+from error import FatalError
+import output
+
 DEBUG = True
 
 def read_file(name):
@@ -18,9 +21,11 @@ def read_file(name):
         fatal('read_file', 'Can not open file', name)
 
 def fatal(who, *msg):
-    output = who + ": " + ' '.join(map(str, msg))
-    print output
-    sys.exit(-1)
+    # what the program printed so far comes before the error
+    output.flush()
+    msg = who + ": " + ' '.join(map(str, msg))
+    print >> sys.stderr, msg
+    raise FatalError(msg)
 
 def debug(*msg):
     if not DEBUG:
@@ -5,14 +5,22 @@
 Expressed Values
 """
 import sys
+import time
+import socket
+from UserDict import DictMixin
 
 from util import *
 from constants import *
+from error import InterpError
+import limits
+import output
 
 class Value(object):
-    pass
+    __slots__ = ()
 
 class BoolValue(Value):
+    __slots__ = ('value',)
+
     def __init__(self, val):
         self.value = val
 
@@ -20,6 +28,8 @@ class BoolValue(Value):
         return str(self.value)
 
 class IntValue(Value):
+    __slots__ = ('value',)
+
     def __init__(self, val):
         self.value = val
 
@@ -27,6 +37,8 @@ class IntValue(Value):
         return str(self.value)
 
 class FloatValue(Value):
+    __slots__ = ('value',)
+
     def __init__(self, val):
         self.value = val
 
@@ -34,13 +46,59 @@ class FloatValue(Value):
         return str(self.value)
 
 class StrValue(Value):
-    def __init__(self, val):
-        self.value = val
+    """
+    String value. The result of a concatenation is kept as a rope (the two
+    operands) and only flattened when its content is needed, so building a
+    long string from many pieces costs linear time.
+    """
+    __slots__ = ('flat', 'left', 'right', 'length')
+
+    def __init__(self, val, left=None, right=None):
+        self.flat = val
+        self.left = left
+        self.right = right
+        if val is None:
+            self.length = left.length + right.length
+        else:
+            self.length = len(val)
+
+    @staticmethod
+    def concat(s1, s2):
+        if s1.length == 0:
+            return s2
+        if s2.length == 0:
+            return s1
+        return StrValue(None, s1, s2)
+
+    def flatten(self):
+        if self.flat is None:
+            pieces = []
+            stack = [self]
+            while stack:
+                s = stack.pop()
+                if s.flat is not None:
+                    pieces.append(s.flat)
+                else:
+                    stack.append(s.right)
+                    stack.append(s.left)
+            self.flat = ''.join(pieces)
+            self.left = self.right = None
+        return self.flat
+
+    @property
+    def value(self):
+        return self.flatten()
+
+    def __reduce__(self):
+        # pickled flat, so images and pmap do not recurse down the rope
+        return (StrValue, (self.flatten(),))
 
     def __str__(self):
-        return self.value
+        return self.flatten()
 
 class VectorValue(Value):
+    __slots__ = ('values',)
+
     def __init__(self, vals):
         self.values = vals
 
@@ -49,6 +107,8 @@ class VectorValue(Value):
         return VECTOR_BEGIN + ss + VECTOR_END
 
 class RecordLiteralValue(Value):
+    __slots__ = ('kv_map',)
+
     def __init__(self, kv_map):
         self.kv_map = kv_map
 
@@ -58,18 +118,125 @@ class RecordLiteralValue(Value):
             ss = ss + KEYWORD_PREFIX + str(k) + ' ' + str(self.kv_map[k]) + ' '
         return RECORD_BEGIN + ss.strip() + RECORD_END
 
+class Exports(DictMixin, object):
+    """
+    the top-level names of a module as a mapping read through its global
+    table, so a set! inside the module is seen by its importers
+    """
+    __slots__ = ('table',)
+
+    def __init__(self, table):
+        self.table = table      # SymTable.table of the module
+
+    def __getitem__(self, name):
+        entry = self.table.get(name)
+        if entry is None or 'value' not in entry:
+            raise KeyError(name)
+        return entry['value']
+
+    def __setitem__(self, name, val):
+        if name not in self:
+            raise KeyError(name)
+        self.table[name]['value'] = val
+
+    def __delitem__(self, name):
+        raise TypeError("can't remove the export of a module")
+
+    def __contains__(self, name):
+        return 'value' in self.table.get(name, ())
+
+    def keys(self):
+        return [k for k, entry in self.table.iteritems() if 'value' in entry]
+
+class ModuleValue(RecordLiteralValue):
+    """
+    an imported module, a record of its top-level names; load(module)
+    evaluates it on the first access to kv_map
+    """
+    __slots__ = ('name', 'path', 'node', 'load', 'exports')
+
+    def __init__(self, name, path, node, load):
+        self.name = name
+        self.path = path
+        self.node = node        # the ImportNode
+        self.load = load
+        self.exports = None
+
+    @property
+    def kv_map(self):
+        if self.exports is None:
+            self.exports = self.load(self)
+        return self.exports
+
+    def __reduce__(self):
+        # kv_map is a property here, the slot of RecordLiteralValue unused
+        return (ModuleValue, (self.name, self.path, self.node, self.load),
+                self.exports)
+
+    def __setstate__(self, exports):
+        self.exports = exports
+
+    def __str__(self):
+        return '<Module: %s>' % self.name
+
+class SocketValue(Value):
+    __slots__ = ('sock', 'path')
+
+    def __init__(self, sock, path):
+        self.sock = sock
+        self.path = path
+
+    def __str__(self):
+        return '<Socket: %s>' % self.path
+
 class Closure(Value):
-    def __init__(self, args, properties, body, tbl):
+    __slots__ = ('args', 'properties', 'body', 'tbl', 'guards')
+
+    def __init__(self, args, properties, body, tbl, guards=None):
         self.args = args
         self.properties = properties
         self.body = body
         self.tbl = tbl
+        self.guards = guards    # [(param name, value class)] when checked
+
+    def apply(self, args):
+        """
+        call the closure on positional arguments where no call node is
+        being evaluated (apply_fun goes through the call of the primitive
+        otherwise), e.g. from python: the body stands for the call in the
+        callstack
+        """
+        if len(args) != len(self.args):
+            raise InterpError(self.body, 'wrong number of actual arguments')
+        if limits.state.active:
+            limits.state.active.step(self.body)
+        tbl = type(self.tbl)(self.tbl)
+        guards = self.guards
+        for param, v in zip(self.args, args):
+            if guards:
+                guard = guards.get(param.id)
+                if guard and not isinstance(v, guard[0]):
+                    raise InterpError(self.body, 'argument %s is not of type %s'
+                                      % (param.id, guard[1]))
+            tbl.put_value(param.id, v)
+        frames = callstack.frames
+        frames.append(self.body)
+        try:
+            return self.body.interp(tbl)
+        finally:
+            frames.pop()
 
     def __str__(self):
-        return str(self.args) + 'Env: ' + str(self.env)
+        return '<Closure: (%s)>' % ' '.join([a.id for a in self.args])
 
 ############ primitive functions ####################
 class PrimitiveFun(Value):
+    __slots__ = ('op', 'min_arity', 'max_arity')
+
+    # primitives that call functions they are given (apply_fun) are on the
+    # callstack while they run
+    calls_back = False
+
     def __init__(self, op, min_arity, max_arity):
         self.op = op
         self.min_arity = min_arity
@@ -96,44 +263,51 @@ class Add(PrimitiveFun):
             return args
         else:
             has_float = False
-            ret = 0
             for arg in args:
                 if (not isinstance(arg, IntValue)) and\
                    (not isinstance(arg, FloatValue)):
                     fatal('arguments for + must be integer or float')
                 if isinstance(arg, FloatValue):
                     has_float = True
-                ret += arg.value
+            ret = self.compute([arg.value for arg in args])
             if has_float:
                 return FloatValue(ret)
             else:
                 return IntValue(ret)
 
+    def compute(self, xs):
+        ret = 0
+        for x in xs:
+            ret += x
+        return ret
+
 class Sub(PrimitiveFun):
     def __init__(self):
         super(Sub, self).__init__('-', 1, sys.maxint)
 
     def apply(self, args):
         has_float = False
-        ret = 0
-        for i, arg in enumerate(args):
+        for arg in args:
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('argument for - must be integer or float')
             if isinstance(arg, FloatValue):
                 has_float = True
-            if i == 0:
-                ret = arg.value
-            else:
-                ret -= arg.value
-        if len(args) == 1:      # minus
-            ret = -ret
+        ret = self.compute([arg.value for arg in args])
 
         if has_float:
             return FloatValue(ret)
         else:
             return IntValue(ret)
 
+    def compute(self, xs):
+        ret = xs[0]
+        for x in xs[1:]:
+            ret -= x
+        if len(xs) == 1:        # minus
+            ret = -ret
+        return ret
+
 class Mult(PrimitiveFun):
     def __init__(self):
         super(Mult, self).__init__('*', 0, sys.maxint)
@@ -145,19 +319,24 @@ class Mult(PrimitiveFun):
             return args
         else:
             has_float = False
-            ret = 1
             for arg in args:
                 if (not isinstance(arg, IntValue)) and\
                    (not isinstance(arg, FloatValue)):
                     fatal('Mult', 'argument for + must be integer or float')
                 if isinstance(arg, FloatValue):
                     has_float = True
-                ret *= arg.value
+            ret = self.compute([arg.value for arg in args])
             if has_float:
                 return FloatValue(ret)
             else:
                 return IntValue(ret)
 
+    def compute(self, xs):
+        ret = 1
+        for x in xs:
+            ret *= x
+        return ret
+
 
 class Div(PrimitiveFun):
     def __init__(self):
@@ -168,29 +347,30 @@ class Div(PrimitiveFun):
             return args
 
         has_float = False
-        ret = 0
-        for i, arg in enumerate(args):
+        for arg in args:
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Sub', 'argument for + must be integer or float')
             if isinstance(arg, FloatValue):
                 has_float = True
-            if i == 0:
-                ret = arg.value
-            else:
-                ret /= arg.value
+        ret = self.compute([arg.value for arg in args])
         if has_float:
             return FloatValue(ret)
         else:
             return IntValue(ret)
 
+    def compute(self, xs):
+        ret = xs[0]
+        for x in xs[1:]:
+            ret /= x
+        return ret
+
 class Print(PrimitiveFun):
     def __init__(self):
         super(Print, self).__init__('print', 1, sys.maxint)
 
     def apply(self, args):
-        output = ''.join(map(str, args))
-        print output
+        output.write(''.join(map(str, args)) + '\n')
 
     def __str__(self):
         return '<Primitive Function: print>'
@@ -200,24 +380,32 @@ class And(PrimitiveFun):
         super(And, self).__init__('and', 0, sys.maxint)
 
     def apply(self, args):
-        ret = True
         for arg in args:
             if not isinstance(arg, BoolValue):
                 fatal('And', 'argument for And must be boolean')
-            ret = (ret and arg.value)
-        return BoolValue(ret)
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
+        ret = True
+        for x in xs:
+            ret = (ret and x)
+        return ret
 
 class Or(PrimitiveFun):
     def __init__(self):
         super(Or, self).__init__('or', 0, sys.maxint)
 
     def apply(self, args):
-        ret = False
         for arg in args:
             if not isinstance(arg, BoolValue):
                 fatal('And', 'argument for And must be boolean')
-            ret = (ret or arg.value)
-        return BoolValue(ret)
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
+        ret = False
+        for x in xs:
+            ret = (ret or x)
+        return ret
 
 class Not(PrimitiveFun):
     def __init__(self):
@@ -227,8 +415,10 @@ class Not(PrimitiveFun):
         arg = args[0]
         if not isinstance(arg, BoolValue):
             fatal('Not.apply', 'argument for Not must be boolean')
-        ret = (not arg.value)
-        return BoolValue(ret)
+        return BoolValue(self.compute([arg.value]))
+
+    def compute(self, xs):
+        return (not xs[0])
 
 
 class Lt(PrimitiveFun):
@@ -240,16 +430,19 @@ class Lt(PrimitiveFun):
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Lt.apply', 'argument is not integer or float')
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
         ret = True
-        for n1 in range(0, len(args)-1):
-            arg1 = args[n1]
-            arg2 = args[n1 + 1]
+        for n1 in range(0, len(xs)-1):
+            x1 = xs[n1]
+            x2 = xs[n1 + 1]
 
-            if arg1.value < arg2.value:
+            if x1 < x2:
                 ret = True
             else:
                 ret = False
-        return BoolValue(ret)
+        return ret
 
 
 class Lte(PrimitiveFun):
@@ -261,16 +454,19 @@ class Lte(PrimitiveFun):
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Lt.apply', 'argument is not integer or float')
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
         ret = True
-        for n1 in range(0, len(args)-1):
-            arg1 = args[n1]
-            arg2 = args[n1 + 1]
+        for n1 in range(0, len(xs)-1):
+            x1 = xs[n1]
+            x2 = xs[n1 + 1]
 
-            if arg1.value <= arg2.value:
+            if x1 <= x2:
                 ret = True
             else:
                 ret = False
-        return BoolValue(ret)
+        return ret
 
 
 class Gt(PrimitiveFun):
@@ -282,16 +478,19 @@ class Gt(PrimitiveFun):
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Lt.apply', 'argument is not integer or float')
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
         ret = True
-        for n1 in range(0, len(args)-1):
-            arg1 = args[n1]
-            arg2 = args[n1 + 1]
+        for n1 in range(0, len(xs)-1):
+            x1 = xs[n1]
+            x2 = xs[n1 + 1]
 
-            if arg1.value > arg2.value:
+            if x1 > x2:
                 ret = True
             else:
                 ret = False
-        return BoolValue(ret)
+        return ret
 
 
 class Gte(PrimitiveFun):
@@ -303,16 +502,19 @@ class Gte(PrimitiveFun):
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Gte.apply', 'argument is not integer or float')
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
         ret = True
-        for n1 in range(0, len(args)-1):
-            arg1 = args[n1]
-            arg2 = args[n1 + 1]
+        for n1 in range(0, len(xs)-1):
+            x1 = xs[n1]
+            x2 = xs[n1 + 1]
 
-            if arg1.value < arg2.value:
+            if x1 < x2:
                 ret = True
             else:
                 ret = False
-        return BoolValue(ret)
+        return ret
 
 
 class Eq(PrimitiveFun):
@@ -320,25 +522,362 @@ class Eq(PrimitiveFun):
         super(Eq, self).__init__('=', 2, sys.maxint)
 
     def apply(self, args):
+        if isinstance(args[0], StrValue):
+            for arg in args:
+                if not isinstance(arg, StrValue):
+                    fatal('Eq.apply', 'argument is not string')
+            ret = True
+            for n1 in range(0, len(args)-1):
+                if args[n1] is args[n1 + 1]:    # e.g. the same literal
+                    continue
+                if args[n1].length != args[n1 + 1].length or\
+                   args[n1].value != args[n1 + 1].value:
+                    ret = False
+            return BoolValue(ret)
         for arg in args:
             if (not isinstance(arg, IntValue)) and\
                (not isinstance(arg, FloatValue)):
                 fatal('Lt.apply', 'argument is not integer or float')
+        return BoolValue(self.compute([arg.value for arg in args]))
+
+    def compute(self, xs):
         ret = True
-        for n1 in range(0, len(args)-1):
-            arg1 = args[n1]
-            arg2 = args[n1 + 1]
+        for n1 in range(0, len(xs)-1):
+            x1 = xs[n1]
+            x2 = xs[n1 + 1]
 
-            if arg1.value == arg2.value:
+            if x1 == x2:
                 ret = True
             else:
                 ret = False
-        return BoolValue(ret)
+        return ret
+
+
+class StrAppend(PrimitiveFun):
+    def __init__(self):
+        super(StrAppend, self).__init__('string-append', 0, sys.maxint)
+
+    def apply(self, args):
+        ret = StrValue('')
+        for arg in args:
+            if not isinstance(arg, StrValue):
+                fatal('StrAppend.apply', 'argument is not string')
+            ret = StrValue.concat(ret, arg)
+        return ret
+
+
+class Substring(PrimitiveFun):
+    def __init__(self):
+        super(Substring, self).__init__('substring', 2, 3)
+
+    def apply(self, args):
+        s = args[0]
+        if not isinstance(s, StrValue):
+            fatal('Substring.apply', 'first argument is not string')
+        for arg in args[1:]:
+            if not isinstance(arg, IntValue):
+                fatal('Substring.apply', 'index is not integer')
+        start = args[1].value
+        if len(args) == 3:
+            end = args[2].value
+        else:
+            end = s.length
+        if start < 0 or end > s.length or start > end:
+            fatal('Substring.apply', 'index out of range')
+        return StrValue(s.value[start:end])
+
+
+class StrLength(PrimitiveFun):
+    def __init__(self):
+        super(StrLength, self).__init__('string-length', 1, 1)
+
+    def apply(self, args):
+        s = args[0]
+        if not isinstance(s, StrValue):
+            fatal('StrLength.apply', 'argument is not string')
+        return IntValue(s.length)
+
+
+class StrJoin(PrimitiveFun):
+    def __init__(self):
+        super(StrJoin, self).__init__('string-join', 1, 2)
+
+    def apply(self, args):
+        vec = args[0]
+        if not isinstance(vec, VectorValue):
+            fatal('StrJoin.apply', 'first argument is not vector')
+        sep = ''
+        if len(args) == 2:
+            if not isinstance(args[1], StrValue):
+                fatal('StrJoin.apply', 'separator is not string')
+            sep = args[1].value
+        for s in vec.values:
+            if not isinstance(s, StrValue):
+                fatal('StrJoin.apply', 'vector element is not string')
+        return StrValue(sep.join([s.value for s in vec.values]))
+
+
+class StrSplit(PrimitiveFun):
+    def __init__(self):
+        super(StrSplit, self).__init__('string-split', 1, 2)
+
+    def apply(self, args):
+        s = args[0]
+        if not isinstance(s, StrValue):
+            fatal('StrSplit.apply', 'first argument is not string')
+        sep = None
+        if len(args) == 2:
+            if not isinstance(args[1], StrValue) or args[1].length == 0:
+                fatal('StrSplit.apply', 'separator is not a non-empty string')
+            sep = args[1].value
+        return VectorValue([StrValue(p) for p in s.value.split(sep)])
+
+
+############ I/O primitives ###########################
+# they block only the calling thread (the GIL is released while waiting),
+# so programs started with Interpreter.interp_async keep running
+
+class Sleep(PrimitiveFun):
+    def __init__(self):
+        super(Sleep, self).__init__('sleep', 1, 1)
+
+    def apply(self, args):
+        arg = args[0]
+        if (not isinstance(arg, IntValue)) and\
+           (not isinstance(arg, FloatValue)):
+            fatal('Sleep.apply', 'argument is not integer or float')
+        time.sleep(arg.value)
+        return BoolValue(True)
+
+
+class ReadFile(PrimitiveFun):
+    def __init__(self):
+        super(ReadFile, self).__init__('read-file', 1, 1)
+
+    def apply(self, args):
+        path = args[0]
+        if not isinstance(path, StrValue):
+            fatal('ReadFile.apply', 'argument is not string')
+        return StrValue(read_file(path.value))
+
+
+class SocketOpen(PrimitiveFun):
+    def __init__(self):
+        super(SocketOpen, self).__init__('socket-open', 1, 1)
+
+    def apply(self, args):
+        path = args[0]
+        if not isinstance(path, StrValue):
+            fatal('SocketOpen.apply', 'argument is not string')
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            sock.connect(path.value)
+        except socket.error, e:
+            fatal('SocketOpen.apply', 'can not connect to', path.value, e)
+        return SocketValue(sock, path.value)
+
+
+class SocketRead(PrimitiveFun):
+    def __init__(self):
+        super(SocketRead, self).__init__('socket-read', 1, 2)
+
+    def apply(self, args):
+        sock = args[0]
+        if not isinstance(sock, SocketValue):
+            fatal('SocketRead.apply', 'first argument is not socket')
+        size = 4096
+        if len(args) == 2:
+            if not isinstance(args[1], IntValue):
+                fatal('SocketRead.apply', 'size is not integer')
+            size = args[1].value
+        return StrValue(sock.sock.recv(size).decode('utf8'))
+
+
+class SocketWrite(PrimitiveFun):
+    def __init__(self):
+        super(SocketWrite, self).__init__('socket-write', 2, 2)
+
+    def apply(self, args):
+        sock, data = args
+        if not isinstance(sock, SocketValue):
+            fatal('SocketWrite.apply', 'first argument is not socket')
+        if not isinstance(data, StrValue):
+            fatal('SocketWrite.apply', 'second argument is not string')
+        buf = data.value.encode('utf8')
+        sock.sock.sendall(buf)
+        return IntValue(len(buf))
+
+
+class SocketClose(PrimitiveFun):
+    def __init__(self):
+        super(SocketClose, self).__init__('socket-close', 1, 1)
+
+    def apply(self, args):
+        sock = args[0]
+        if not isinstance(sock, SocketValue):
+            fatal('SocketClose.apply', 'argument is not socket')
+        sock.sock.close()
+        return BoolValue(True)
+
+
+############## higher-order primitives ######################
+def apply_fun(name, f, args):
+    """
+    call a closure or a primitive function from a primitive. Called back by
+    a primitive like map, whose call is then on top of the callstack, it is
+    applied like a call written there: budgeted, its errors have a position
+    and the profiler, the hooks and the stats see it
+    """
+    frames = callstack.frames
+    if frames and callstack.callback_depth == len(frames):
+        site = frames[-1]
+        if limits.state.active:
+            limits.state.active.step(site)
+        return site.apply(f, args, {})
+    if isinstance(f, Closure):
+        return f.apply(args)
+    elif isinstance(f, PrimitiveFun):
+        if not f.check_arity(len(args)):
+            fatal(name, 'wrong number of arguments for %s' % f.op)
+        return f.apply(args)
+    else:
+        fatal(name, 'argument is not a function')
+
+
+def vector_arg(name, v):
+    if not isinstance(v, VectorValue):
+        fatal(name, 'argument is not vector')
+    return v.values
+
+
+class Range(PrimitiveFun):
+    def __init__(self):
+        super(Range, self).__init__('range', 1, 3)
+
+    def apply(self, args):
+        for arg in args:
+            if not isinstance(arg, IntValue):
+                fatal('Range.apply', 'argument for range must be integer')
+        xs = [arg.value for arg in args]
+        if len(xs) == 3 and xs[2] == 0:
+            fatal('Range.apply', 'step of range is zero')
+        return VectorValue([IntValue(i) for i in xrange(*xs)])
+
+
+class Length(PrimitiveFun):
+    def __init__(self):
+        super(Length, self).__init__('length', 1, 1)
+
+    def apply(self, args):
+        v = args[0]
+        if isinstance(v, StrValue):
+            return IntValue(v.length)
+        return IntValue(len(vector_arg('Length.apply', v)))
+
+
+class Map(PrimitiveFun):
+    calls_back = True
+
+    def __init__(self):
+        super(Map, self).__init__('map', 2, sys.maxint)
+
+    def apply(self, args):
+        f = args[0]
+        vecs = [vector_arg('Map.apply', v) for v in args[1:]]
+        if len(vecs) == 1:
+            return VectorValue([apply_fun('Map.apply', f, [x])
+                                for x in vecs[0]])
+        if len(set(map(len, vecs))) != 1:
+            fatal('Map.apply', 'the vectors must have same length')
+        return VectorValue([apply_fun('Map.apply', f, list(xs))
+                            for xs in zip(*vecs)])
+
+
+class Filter(PrimitiveFun):
+    calls_back = True
+
+    def __init__(self):
+        super(Filter, self).__init__('filter', 2, 2)
+
+    def apply(self, args):
+        f = args[0]
+        ret = []
+        for x in vector_arg('Filter.apply', args[1]):
+            keep = apply_fun('Filter.apply', f, [x])
+            if not isinstance(keep, BoolValue):
+                fatal('Filter.apply', 'predicate must return boolean')
+            if keep.value:
+                ret.append(x)
+        return VectorValue(ret)
+
+
+class Reduce(PrimitiveFun):
+    """
+    (reduce f init vec) folds vec from the left, (reduce f vec) starts with
+    the first element
+    """
+    calls_back = True
+
+    def __init__(self):
+        super(Reduce, self).__init__('reduce', 2, 3)
+
+    def apply(self, args):
+        f = args[0]
+        xs = vector_arg('Reduce.apply', args[-1])
+        if len(args) == 3:
+            acc = args[1]
+        elif xs:
+            acc, xs = xs[0], xs[1:]
+        else:
+            fatal('Reduce.apply', 'empty vector and no initial value')
+        for x in xs:
+            acc = apply_fun('Reduce.apply', f, [acc, x])
+        return acc
+
+
+class ForEach(PrimitiveFun):
+    calls_back = True
+
+    def __init__(self):
+        super(ForEach, self).__init__('for-each', 2, sys.maxint)
+
+    def apply(self, args):
+        f = args[0]
+        vecs = [vector_arg('ForEach.apply', v) for v in args[1:]]
+        if len(set(map(len, vecs))) != 1:
+            fatal('ForEach.apply', 'the vectors must have same length')
+        for xs in zip(*vecs):
+            apply_fun('ForEach.apply', f, list(xs))
+
+class PMap(PrimitiveFun):
+    """
+    (pmap f vec [chunk] [workers]) is (map f vec) in worker processes,
+    see parallel.py
+    """
+    calls_back = True
+
+    def __init__(self):
+        super(PMap, self).__init__('pmap', 2, 4)
+
+    def apply(self, args):
+        from parallel import pmap
+        f = args[0]
+        if not isinstance(f, (Closure, PrimitiveFun)):
+            fatal('PMap.apply', 'argument is not a function')
+        xs = vector_arg('PMap.apply', args[1])
+        opts = []
+        for arg in args[2:]:
+            if not isinstance(arg, IntValue) or arg.value < 1:
+                fatal('PMap.apply', 'chunk and workers must be positive integers')
+            opts.append(arg.value)
+        return VectorValue(pmap(f, xs, *opts))
 
 ############## end primitive functions ######################
 
 ############## types ########################################
 class Type(Value):
+    __slots__ = ('name',)
+
     def __init__(self, name):
         self.name = name
 
@@ -349,28 +888,89 @@ class Type(Value):
     def subtype(ty1, ty2):
         pass
 
-class BoolType(Type):
+class SingletonType(Type):
+    """
+    the basic types are compared with `is`, so they stay singletons when
+    pickled
+    """
+    __slots__ = ()
+    key = None          # attribute of BasicType
+
+    def __reduce__(self):
+        return (getattr, (BasicType, self.key))
+
+class BoolType(SingletonType):
+    __slots__ = ()
+    key = 'BOOL'
+
     def __init__(self):
         super(BoolType, self).__init__('Bool')
 
-class IntType(Type):
+class IntType(SingletonType):
+    __slots__ = ()
+    key = 'INT'
+
     def __init__(self):
         super(IntType, self).__init__('Int')
 
-class StrType(Type):
+class StrType(SingletonType):
+    __slots__ = ()
+    key = 'STR'
+
     def __init__(self):
         super(StrType, self).__init__('String')
 
+class FloatType(SingletonType):
+    __slots__ = ()
+    key = 'FLOAT'
+
+    def __init__(self):
+        super(FloatType, self).__init__('Float')
+
+class AnyType(SingletonType):
+    __slots__ = ()
+    key = 'ANY'
+
+    def __init__(self):
+        super(AnyType, self).__init__("Any")
+
 class BasicType(object):
     BOOL = BoolType()
     INT = IntType()
     STR = StrType()
-
-class AnyType(Type):
-    def __init__(self):
-        super(AnyType, self).__init__("Any")
+    FLOAT = FloatType()
+    ANY = AnyType()
 
 class UnionType(Type):
+    __slots__ = ('types',)
+
     def __init__(self, *types):
         super(UnionType, self).__init__("U:")
         self.types = types
+
+class FunType(Type):
+    """
+    type of a closure: parameter types and the inferred result type
+    """
+    __slots__ = ('params', 'ret')
+
+    def __init__(self, params, ret):
+        super(FunType, self).__init__("Fun")
+        self.params = params
+        self.ret = ret
+
+    def __str__(self):
+        return '(-> ' + ' '.join(map(str, self.params + [self.ret])) + ')'
+
+class PrimType(Type):
+    """
+    type of a primitive function, the type checker has a rule for each one
+    """
+    __slots__ = ('prim',)
+
+    def __init__(self, prim):
+        super(PrimType, self).__init__(prim.op)
+        self.prim = prim
+
+    def __str__(self):
+        return '<Primitive: %s>' % self.name
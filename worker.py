@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+#-*- coding:utf-8 -*-
+
+"""
+run one yin program in isolation and capture its output and errors,
+shared by the interpreter server and the batch runner
+"""
+import sys
+import time
+import signal
+import traceback
+from StringIO import StringIO
+
+from interpreter import Interpreter
+from environment import SymTable
+from constants import callstack
+from error import BudgetError
+from limits import Budget
+from output import Sink
+import modules
+
+
+class JobTimeout(Exception):
+    pass
+
+
+def _on_alarm(signum, frame):
+    raise JobTimeout()
+
+
+def warm_up():
+    """
+    build everything a job needs before the first job arrives
+    """
+    SymTable.prelude_value_table()
+
+
+def run_job(fname, text=None, timeout=None, budget=None):
+    """
+    evaluate a program given by path or by source text, returns a dict with
+    the captured output, the error message (None on success) and wall time.
+    A timeout in seconds is enforced with SIGALRM, so it must be called from
+    the main thread of the process. budget is a dict of limits.Budget
+    arguments.
+    """
+    out = StringIO()
+    err = StringIO()
+    old_out, old_err = sys.stdout, sys.stderr
+    sys.stdout, sys.stderr = out, err
+    error = None
+    start = time.time()
+    if timeout:
+        old_handler = signal.signal(signal.SIGALRM, _on_alarm)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+    try:
+        if budget:
+            budget = Budget(**budget)
+        # a module set! by an earlier job is evaluated again
+        modules.reset()
+        Interpreter(fname, text, budget, output=Sink(out)).interp()
+    except JobTimeout:
+        error = 'timeout after %ss\n' % timeout
+    except BudgetError, e:
+        error = str(e) + '\n'
+    except SystemExit:
+        error = err.getvalue() or 'exit'
+    except Exception:
+        error = err.getvalue() + traceback.format_exc()
+    finally:
+        if timeout:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, old_handler)
+        elapsed = time.time() - start
+        sys.stdout, sys.stderr = old_out, old_err
+        del callstack.frames[:]
+    return {'name': fname,
+            'output': out.getvalue(),
+            'error': error,
+            'time': elapsed}